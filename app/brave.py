@@ -1,7 +1,11 @@
-import os, time, random, threading, requests
+import os, time, random, asyncio, functools
 from typing import List, Dict, Any, Optional
-from .utils import domain_ok, dedupe_urls, TTLCache, sha1
-from .config import BRAVE_API_KEY, WHITELIST
+
+import aiohttp
+from cachetools import TTLCache
+
+from .utils import dedupe_urls, StatsCache, sha1, url_host
+from .config import BRAVE_API_KEY, WHITELIST, MAX_PARALLEL
 
 BRAVE_ENDPOINT = "https://api.search.brave.com/res/v1/web/search"
 
@@ -10,25 +14,52 @@ _BRAVE_RPS = float(os.getenv("BRAVE_RPS", "1.0"))          # requests per second
 _BRAVE_BURST = int(os.getenv("BRAVE_BURST", "2"))          # short burst capacity
 _BRAVE_MAX_RETRIES = int(os.getenv("BRAVE_MAX_RETRIES", "4"))
 _BACKOFF_BASE_MS = int(os.getenv("BRAVE_BACKOFF_BASE_MS", "250"))
+_BACKOFF_MAX_MS = int(os.getenv("BRAVE_BACKOFF_MAX_MS", "15000"))
 _CACHE_TTL_SEC = int(os.getenv("BRAVE_CACHE_TTL_SEC", "1800"))  # 30 min
+_CACHE_MAX_ITEMS = int(os.getenv("BRAVE_CACHE_MAX_ITEMS", "4096"))
+
+_cache = StatsCache(TTLCache(maxsize=_CACHE_MAX_ITEMS, ttl=_CACHE_TTL_SEC))
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Size and hit/miss counters of the Brave results cache."""
+    return _cache.stats()
+
+# Shared HTTP session (connection pool), created lazily inside the running loop
+_session: Optional[aiohttp.ClientSession] = None
 
-_cache = TTLCache(ttl_sec=_CACHE_TTL_SEC, max_items=1024)
+
+def _get_session() -> aiohttp.ClientSession:
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=max(1, MAX_PARALLEL), ttl_dns_cache=300),
+        )
+    return _session
+
+
+async def close_session():
+    """Close the shared Brave session (called from the app lifespan)."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
 
 
 class _TokenBucket:
     """
     Simple leaky bucket: allows BRAVE_BURST immediate tokens, then refills at BRAVE_RPS.
-    Thread-safe and process-local.
+    Guarded by an asyncio.Lock (all callers live on the event loop); process-local.
     """
     def __init__(self, rps: float, burst: int):
         self.capacity = max(1, burst)
         self.tokens = self.capacity
         self.rate = max(0.1, rps)
         self.updated = time.time()
-        self.lock = threading.Lock()
+        self.lock = asyncio.Lock()
 
-    def take(self):
-        with self.lock:
+    async def take(self):
+        async with self.lock:
             now = time.time()
             # refill
             delta = now - self.updated
@@ -42,59 +73,110 @@ class _TokenBucket:
 _BUCKET = _TokenBucket(_BRAVE_RPS, _BRAVE_BURST)
 
 
-def _sleep_ms(ms: int):
-    time.sleep(ms / 1000.0)
+async def _sleep_ms(ms: float):
+    await asyncio.sleep(ms / 1000.0)
+
+
+def _retry_after_ms(value: Optional[str]) -> float:
+    """Retry-After in delta-seconds form -> ms (HTTP-date form is ignored)."""
+    try:
+        return min(_BACKOFF_MAX_MS, max(0.0, float(value)) * 1000.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _owned(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # callers (retrieval scoring) enrich result dicts in place; cached entries must stay pristine
+    return [dict(r) for r in results]
+
+
+def _published(item: Dict[str, Any]) -> Optional[str]:
+    """Publication date string, or None when Brave sent nothing usable (missing/blank/"None")."""
+    raw = item.get("published") or item.get("date") or item.get("page_age")
+    if not isinstance(raw, str):
+        return None
+    raw = raw.strip()
+    return raw if raw and raw.lower() not in ("none", "null") else None
+
+
+def normalize_query(query: str) -> str:
+    return " ".join((query or "").lower().split())
+
+
+@functools.lru_cache(maxsize=16)
+def _parse_whitelist(raw: str) -> tuple:
+    return tuple(d.strip() for d in raw.split(",") if d.strip())
 
 
 class BraveClient:
     def __init__(self, api_key: Optional[str] = None, whitelist: Optional[str] = None):
         self.api_key = api_key or BRAVE_API_KEY
-        self.whitelist = [d.strip() for d in (whitelist or ",".join(WHITELIST)).split(",") if d.strip()]
+        self.whitelist = _parse_whitelist(whitelist or ",".join(WHITELIST))
+        # derived once per client: cache-key suffix and host matchers
+        self._wl_joined = ",".join(self.whitelist)
+        self._wl_set = frozenset(d.lower() for d in self.whitelist)
+        self._wl_suffixes = tuple("." + d for d in self._wl_set)
+
+    def _allowed(self, url: str) -> bool:
+        """Whitelist check: exact host or any subdomain of a whitelisted domain."""
+        if not self._wl_set:
+            return True
+        host = url_host(url)
+        if not host:
+            return False
+        return host in self._wl_set or host.endswith(self._wl_suffixes)
 
-    def _request(self, params: Dict[str, Any]) -> Dict[str, Any]:
+    async def _request(self, params: Dict[str, Any]) -> Dict[str, Any]:
         if not self.api_key:
             raise RuntimeError("Missing BRAVE_API_KEY")
 
         # Rate-limit gate
-        while not _BUCKET.take():
-            _sleep_ms(50)
+        while not await _BUCKET.take():
+            await _sleep_ms(50)
 
         headers = {"X-Subscription-Token": self.api_key}
-        # Retry with exponential backoff + jitter
+        session = _get_session()
+        # Retry with exponential backoff + full jitter
         attempt = 0
         last_exc = None
         while attempt <= _BRAVE_MAX_RETRIES:
+            retry_after_ms = 0
             try:
-                r = requests.get(BRAVE_ENDPOINT, headers=headers, params=params, timeout=15)
-                # 429 or 5xx => retry
-                if r.status_code == 429 or 500 <= r.status_code < 600:
-                    attempt += 1
-                    # backoff with jitter
-                    delay = (_BACKOFF_BASE_MS * (2 ** (attempt - 1))) + random.randint(0, 150)
-                    _sleep_ms(min(4000, delay))
-                    continue
-                r.raise_for_status()
-                return r.json()
-            except requests.HTTPError as e:
+                async with session.get(BRAVE_ENDPOINT, headers=headers, params=params,
+                                       timeout=aiohttp.ClientTimeout(total=15)) as r:
+                    # 429 or 5xx => retry (sleep below, after the connection is released)
+                    if not (r.status == 429 or 500 <= r.status < 600):
+                        r.raise_for_status()
+                        return await r.json(content_type=None)
+                    if r.status == 429:
+                        retry_after_ms = _retry_after_ms(r.headers.get("Retry-After"))
+            except aiohttp.ClientResponseError:
                 # Non-retryable 4xx
-                if 400 <= r.status_code < 500 and r.status_code != 429:
-                    raise
-                last_exc = e
+                raise
             except Exception as e:
                 last_exc = e
-                attempt += 1
-                delay = (_BACKOFF_BASE_MS * (2 ** (attempt - 1))) + random.randint(0, 150)
-                _sleep_ms(min(4000, delay))
+            attempt += 1
+            # full jitter: uniform in [0, min(cap, base * 2^(attempt+1))], Retry-After as a floor
+            delay = random.random() * min(_BACKOFF_MAX_MS, _BACKOFF_BASE_MS * (2 ** (attempt + 1)))
+            await _sleep_ms(max(retry_after_ms, delay))
         # exhausted
         if last_exc:
             raise last_exc
         raise RuntimeError("Brave request failed after retries")
 
-    def search(self, query: str, count: int = 6) -> List[Dict[str, Any]]:
-        key = "brv:" + sha1(f"{query}|{count}|{','.join(self.whitelist)}")
+    async def search(self, query: str, count: int = 6,
+                     deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Cached Brave web+news search. `deadline` (seconds) bounds the request including its
+        retries; running out of time counts as a failure, so the stale fallback still applies.
+        """
+        # case/whitespace variants of a query share one cache entry
+        norm = normalize_query(query)
+        key = "brv:" + sha1(f"{norm}|{count}|{self._wl_joined}")
+        wild_key = "brv:" + sha1(f"{norm}|*|{self._wl_joined}")
         cached = _cache.get(key)
         if cached is not None:
-            return cached
+            return _owned(cached)
 
         params = {
             "q": query,
@@ -103,12 +185,12 @@ class BraveClient:
             "safesearch": "moderate",
         }
         try:
-            data = self._request(params)
+            data = await asyncio.wait_for(self._request(params), deadline)
         except Exception as e:
             # On failure, attempt stale cache fallback by ignoring count in key
-            stale = _cache.get("brv:" + sha1(f"{query}|*|{','.join(self.whitelist)}"))
+            stale = _cache.get(wild_key)
             if stale is not None:
-                return stale
+                return _owned(stale)
             # bubble up if nothing cached
             raise
 
@@ -121,12 +203,18 @@ class BraveClient:
                     "url": item.get("url"),
                     "snippet": item.get("description") or item.get("snippet"),
                     "source": item.get("source"),
-                    "published": item.get("published") or item.get("date"),
+                    "published": _published(item),
                 })
         # apply whitelist + dedupe
-        results = [r for r in results if domain_ok(r.get("url", ""), self.whitelist)]
+        results = [r for r in results if self._allowed(r.get("url") or "")]
         results = dedupe_urls(results)[:count]
         # write two cache keys (exact + wildcard fallback)
         _cache.set(key, results)
-        _cache.set("brv:" + sha1(f"{query}|*|{','.join(self.whitelist)}"), results)
-        return results
+        _cache.set(wild_key, results)
+        return _owned(results)
+
+
+@functools.lru_cache(maxsize=4)
+def get_brave_client(api_key: Optional[str] = None, whitelist: Optional[str] = None) -> BraveClient:
+    """Shared BraveClient per (api_key, whitelist) so per-request setup happens once."""
+    return BraveClient(api_key=api_key, whitelist=whitelist)
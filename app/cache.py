@@ -0,0 +1,175 @@
+import os
+import re
+import asyncio
+import logging
+import functools
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from cachetools import TTLCache
+
+from .utils import StatsCache, clean_text, sha1
+
+# Optional near-duplicate layer; disabled when the packages are missing
+try:
+    import numpy as np
+    import faiss
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    faiss = None
+
+log = logging.getLogger("cache")
+
+# ---- Tunables via env ----
+_LLM_CACHE_TTL_SEC = int(os.getenv("LLM_CACHE_TTL_SEC", "600"))
+_LLM_CACHE_MAX_ITEMS = int(os.getenv("LLM_CACHE_MAX_ITEMS", "1024"))
+SEMANTIC_CACHE = os.getenv("SEMANTIC_CACHE", "0") == "1" and faiss is not None
+_SEMANTIC_TAU = float(os.getenv("SEMANTIC_CACHE_TAU", "0.92"))
+_SEMANTIC_MODEL = os.getenv("SEMANTIC_CACHE_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+_SEMANTIC_BACKEND = os.getenv("SEMANTIC_CACHE_BACKEND", "onnx")
+
+# Model outputs keyed on their inputs (text / evidence signature)
+_llm_cache = StatsCache(TTLCache(maxsize=_LLM_CACHE_MAX_ITEMS, ttl=_LLM_CACHE_TTL_SEC))
+_semantic_hits = 0
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Size and hit/miss counters of the model-output cache."""
+    stats = _llm_cache.stats()
+    stats["semantic_enabled"] = SEMANTIC_CACHE
+    stats["semantic_hits"] = _semantic_hits
+    return stats
+
+
+_encoder = None
+
+# Tokens an embedding barely sees but that flip a claim: numbers/years and negations
+_LITERAL_RE = re.compile(r"\d+(?:[.,]\d+)*|\b(?:not|no|never|none|nobody|nothing|neither|nor|without)\b|n't\b")
+
+
+def literal_gate(text: str) -> str:
+    """
+    Numeric and negation tokens of `text`, in order. Used as (part of) the semantic gate so
+    "born in 1879" never matches "born in 1897", nor "is" match "isn't".
+    """
+    return " ".join(_LITERAL_RE.findall(clean_text(text).lower()))
+
+
+def _embed(text: str) -> "np.ndarray":
+    """L2-normalized (1, dim) float32 embedding; the model loads on first use."""
+    global _encoder
+    if _encoder is None:
+        _encoder = SentenceTransformer(_SEMANTIC_MODEL, backend=_SEMANTIC_BACKEND)
+    v = _encoder.encode([text], normalize_embeddings=True)
+    return np.asarray(v, dtype=np.float32)
+
+
+class _SemanticIndex:
+    """
+    Inner-product FAISS index over embeddings of cached inputs. A neighbour only
+    counts when cos >= tau AND its gate (e.g. evidence signature) matches exactly.
+    """
+    def __init__(self, tau: float, max_items: int):
+        self.tau = tau
+        self.max = max_items
+        self.index = None
+        self.entries: List[Tuple[str, str]] = []  # (exact cache key, gate) per row
+        self._last: Optional[Tuple[str, "np.ndarray"]] = None
+
+    async def _vec(self, text: str) -> "np.ndarray":
+        # a miss is followed by an add for the same text: embed it once.
+        # Model load and encode are blocking, so they run off the event loop.
+        if self._last is None or self._last[0] != text:
+            self._last = (text, await asyncio.to_thread(_embed, text))
+        return self._last[1]
+
+    async def search(self, text: str, gate: str) -> Optional[str]:
+        if self.index is None or self.index.ntotal == 0:
+            return None
+        v = await self._vec(text)
+        scores, rows = self.index.search(v, min(4, self.index.ntotal))
+        for score, row in zip(scores[0], rows[0]):
+            if score < self.tau:
+                break
+            key, g = self.entries[row]
+            if g == gate:
+                return key
+        return None
+
+    async def add(self, text: str, gate: str, key: str):
+        v = await self._vec(text)
+        if self.index is None:
+            self.index = faiss.IndexFlatIP(v.shape[1])
+        if self.index.ntotal >= self.max:
+            # rows can't be deleted cheaply; entries past this point are mostly expired anyway
+            self.index.reset()
+            self.entries.clear()
+        self.index.add(v)
+        self.entries.append((key, gate))
+
+
+def text_key(text: str) -> str:
+    return sha1(clean_text(text).lower())
+
+
+def cached_async(key_fn: Callable[..., str],
+                 semantic_fn: Optional[Callable[..., Tuple[str, str]]] = None):
+    """
+    Cache an async model wrapper's result under `<fn name>:<key_fn(*args)>`.
+    With `semantic_fn` (args -> (text, gate)), an exact miss falls back to the
+    nearest cached input when SEMANTIC_CACHE is on (off by default); the gate must
+    match exactly and should include literal_gate(text).
+    The wrapper exposes an async .lookup(*args) so callers can check the cache
+    before spending a rate-limit slot.
+    """
+    def deco(fn):
+        ns = fn.__name__
+        sem = _SemanticIndex(_SEMANTIC_TAU, _LLM_CACHE_MAX_ITEMS) if (semantic_fn and SEMANTIC_CACHE) else None
+
+        def _key(*args, **kwargs) -> str:
+            return f"{ns}:{key_fn(*args, **kwargs)}"
+
+        async def _near(*args, **kwargs):
+            global _semantic_hits
+            if sem is None:
+                return None
+            try:
+                near_key = await sem.search(*semantic_fn(*args, **kwargs))
+            except Exception as e:
+                log.warning("semantic cache lookup failed: %s", e)
+                return None
+            hit = _llm_cache.peek(near_key) if near_key else None
+            if hit is not None:
+                _semantic_hits += 1
+            return hit
+
+        async def _remember(key, value, *args, **kwargs):
+            _llm_cache.set(key, value)
+            if sem is not None:
+                try:
+                    await sem.add(*semantic_fn(*args, **kwargs), key)
+                except Exception as e:
+                    log.warning("semantic cache insert failed: %s", e)
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            key = _key(*args, **kwargs)
+            hit = _llm_cache.get(key)
+            if hit is None:
+                hit = await _near(*args, **kwargs)
+            if hit is not None:
+                return hit
+            value = await fn(*args, **kwargs)
+            if value is not None:
+                await _remember(key, value, *args, **kwargs)
+            return value
+
+        async def lookup(*args, **kwargs):
+            key = _key(*args, **kwargs)
+            # only count it when it's a hit; on a miss the wrapper call counts it
+            if _llm_cache.peek(key) is not None:
+                return _llm_cache.get(key)
+            return await _near(*args, **kwargs)
+
+        wrapper.lookup = lookup
+        return wrapper
+    return deco
@@ -3,5 +3,7 @@ import os
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 BRAVE_API_KEY = os.getenv("BRAVE_API_KEY")
 WHITELIST = [d.strip() for d in os.getenv("WHITELIST_DOMAINS","").split(",") if d.strip()]
-MAX_PARALLEL = int(os.getenv("MAX_PARALLEL", "4"))
+OPENAI_RPM = max(1, int(os.getenv("OPENAI_RPM", "3")))
+# concurrent model/HTTP calls; default follows the RPM budget (4..8)
+MAX_PARALLEL = int(os.getenv("MAX_PARALLEL", str(max(4, min(8, OPENAI_RPM)))))
 APP_BRAND = os.getenv("APP_BRAND", "Agentra FactCheck")
@@ -1,99 +1,133 @@
 import re
-from collections import Counter
+from datetime import date
 from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
 from dateutil import parser as dp
 
-YEAR_RE = re.compile(r"\b(19|20)\d{2}\b")
-MONTHS = r"Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:t(?:ember)?)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?"
-DATE_WORD_RE = re.compile(rf"\b({MONTHS})\s+\d{{1,2}},\s*(\d{{4}})\b", re.IGNORECASE)
+YEAR_RE = re.compile(r"\b(?:19|20)\d{2}\b")
+# month names factored by shared prefix so the alternation branches early
+MONTHS = r"J(?:an(?:uary)?|u(?:ne?|ly?))|Feb(?:ruary)?|Ma(?:r(?:ch)?|y)|A(?:pr(?:il)?|ug(?:ust)?)|Sep(?:t(?:ember)?)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?"
+# one alternation for both kinds of mention so a text is scanned once; dates come first
+# so a full date isn't split into a bare year
+TEMPORAL_RE = re.compile(
+    rf"\b(?P<date>(?P<mon>{MONTHS})\s+(?P<d>\d{{1,2}}),\s*(?P<y>\d{{4}}))\b|\b(?P<year>(?:19|20)\d{{2}})\b",
+    re.IGNORECASE,
+)
+_MON = {m: i for i, m in enumerate(
+    ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), start=1)}
 
-def extract_years(text: str) -> List[int]:
+def _date_iso(m: "re.Match") -> Optional[str]:
+    # normalize to ISO date straight from the captured groups
+    try:
+        return date(int(m.group("y")), _MON[m.group("mon").lower()[:3]], int(m.group("d"))).isoformat()
+    except ValueError:
+        pass
+    try:
+        return dp.parse(m.group("date"), fuzzy=True).date().isoformat()
+    except Exception:
+        return None
+
+def scan_temporal(text: str) -> Tuple[List[Tuple[int, int, int]], List[str]]:
+    """
+    Single pass over `text` -> (years, dates).
+    years: (year, start, end) for every 1900..2099 mention, including the year of a full date.
+    dates: ISO dates for "Mon D, YYYY" mentions.
+    """
+    years: List[Tuple[int, int, int]] = []
+    dates: List[str] = []
     if not text:
-        return []
-    out = []
-    for m in YEAR_RE.finditer(text):
-        try:
-            y = int(m.group(0))
-            if 1900 <= y <= 2100:
-                out.append(y)
-        except Exception:
-            pass
-    return out
+        return years, dates
+    for m in TEMPORAL_RE.finditer(text):
+        if m.lastgroup == "year":
+            years.append((int(m.group("year")), m.start(), m.end()))
+            continue
+        y = m.group("y")
+        if y[:2] in ("19", "20"):
+            years.append((int(y), m.start("y"), m.end("y")))
+        iso = _date_iso(m)
+        if iso:
+            dates.append(iso)
+    return years, dates
+
+def extract_years(text: str) -> List[int]:
+    return [y for y, _, _ in scan_temporal(text)[0]]
 
 def extract_dates(text: str) -> List[str]:
-    if not text:
-        return []
-    dates = []
-    for m in DATE_WORD_RE.finditer(text):
-        try:
-            # normalize to ISO date
-            dt = dp.parse(m.group(0), fuzzy=True)
-            dates.append(dt.date().isoformat())
-        except Exception:
-            pass
-    return dates
+    return scan_temporal(text)[1]
 
 def evidence_years(evidence: List[Dict[str, Any]]) -> List[int]:
     years: List[int] = []
+    parts: List[str] = []
     for ev in evidence:
-        for key in ("published", "title", "snippet"):
-            val = ev.get(key)
-            if not val:
-                continue
-            # First try strict ISO parse for 'published'
-            if key == "published":
-                try:
-                    dt = dp.parse(val)
-                    if 1900 <= dt.year <= 2100:
-                        years.append(dt.year)
-                        continue
-                except Exception:
-                    pass
-            # Fallback regex on any field
-            years.extend(extract_years(str(val)))
+        pub = ev.get("published") or ""
+        # ISO-8601 'published' starts with the year: read it without parsing the date
+        if pub[:4].isdigit() and 1900 <= int(pub[:4]) <= 2099:
+            years.append(int(pub[:4]))
+            pub = ""
+        parts.append(f"{pub} {ev.get('title') or ''} {ev.get('snippet') or ''}")
+    # one regex pass over everything else
+    years.extend(int(y) for y in YEAR_RE.findall("\n".join(parts)))
     return years
 
 def consensus_year(years: List[int]) -> Optional[Tuple[int, int]]:
     if not years:
         return None
-    c = Counter(years).most_common(1)[0]  # (year, count)
-    return c
+    # ties resolve to the first-seen year (evidence rank order), as Counter.most_common did
+    if len(years) >= 16:
+        # YEAR_RE bounds years to 1900..2099 -> offsets 0..199
+        offs = np.asarray(years, dtype=np.int32) - 1900
+        counts_arr = np.bincount(offs, minlength=200)
+        per_item = counts_arr[offs]
+        first = int((per_item == per_item.max()).argmax())
+        return (years[first], int(per_item[first]))
+    counts: Dict[int, int] = {}
+    for y in years:
+        counts[y] = counts.get(y, 0) + 1
+    best, best_n = years[0], 0
+    for y, n in counts.items():  # insertion order = first-seen order
+        if n > best_n:
+            best, best_n = y, n
+    return (best, best_n)  # (year, count)
 
 def temporal_checks(claim_text: str, evidence: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     Compare the claim's explicit year/date to the evidence majority year.
     Returns a list of checks, each containing mismatch info and suggested correction.
     """
-    claim_years = extract_years(claim_text)
-    ev_year_list = evidence_years(evidence)
+    claim_spans, _claim_dates = scan_temporal(claim_text)
     checks: List[Dict[str, Any]] = []
-    if not claim_years or not ev_year_list:
+    # Only a claim with exactly one explicit year can be compared directly;
+    # otherwise skip scanning the evidence altogether.
+    if len(claim_spans) != 1:
+        return checks
+    ev_year_list = evidence_years(evidence)
+    if not ev_year_list:
         return checks
 
-    # If the claim has exactly one explicit year, we can compare directly.
-    if len(claim_years) == 1:
-        claim_year = claim_years[0]
-        cons = consensus_year(ev_year_list)
-        if cons:
-            top_year, freq = cons
-            # confidence heuristic: support from at least 2 independent results
-            conf = freq / max(3, len(ev_year_list))
-            if top_year != claim_year and freq >= 2:
-                # choose up to 3 supporting sources that mention the consensus year
-                sup = []
-                for ev in evidence:
-                    if len(sup) >= 3:
-                        break
-                    hay = f"{ev.get('published','')} {ev.get('title','')} {ev.get('snippet','')}"
-                    if str(top_year) in hay:
-                        sup.append(ev.get("url"))
-                checks.append({
-                    "field": "year",
-                    "status": "mismatch",
-                    "claim": claim_year,
-                    "evidence_consensus": top_year,
-                    "supporting_sources": [u for u in sup if u],
-                    "confidence": round(float(conf), 3),
-                    "suggested_claim": YEAR_RE.sub(str(top_year), claim_text, count=1)
-                })
+    claim_year, y_start, y_end = claim_spans[0]
+    cons = consensus_year(ev_year_list)
+    if cons:
+        top_year, freq = cons
+        # confidence heuristic: support from at least 2 independent results
+        conf = freq / max(3, len(ev_year_list))
+        if top_year != claim_year and freq >= 2:
+            # choose up to 3 supporting sources that mention the consensus year
+            sup = []
+            needle = str(top_year)
+            for ev in evidence:
+                if len(sup) >= 3:
+                    break
+                if any(needle in (ev.get(k) or "") for k in ("published", "title", "snippet")):
+                    u = ev.get("url")
+                    if u:
+                        sup.append(u)
+            checks.append({
+                "field": "year",
+                "status": "mismatch",
+                "claim": claim_year,
+                "evidence_consensus": top_year,
+                "supporting_sources": sup,
+                "confidence": round(float(conf), 3),
+                "suggested_claim": claim_text[:y_start] + str(top_year) + claim_text[y_end:]
+            })
     return checks
@@ -2,18 +2,39 @@ import os
 import logging
 import tempfile
 import asyncio
+from contextlib import asynccontextmanager
 from typing import Optional
 
+import aiofiles
+import orjson
 from fastapi import FastAPI, UploadFile, File, Form
-from fastapi.responses import JSONResponse, FileResponse, StreamingResponse, HTMLResponse
+from fastapi.responses import ORJSONResponse, FileResponse, StreamingResponse, HTMLResponse
 from dotenv import load_dotenv
 
-from .pipeline import FactChecker
+from .pipeline import FactChecker, result_cache_stats
 from .transcribe import transcribe_audio
+from .brave import close_session as close_brave_session, cache_stats as brave_cache_stats
+from .fetch import close_session as close_fetch_session
+from .cache import cache_stats as llm_cache_stats
+from .reasoning import close_client as close_openai_client
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
-app = FastAPI(title="Agentra Multi-Modal Fact Checker (Full)")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # release pooled HTTP connections on shutdown
+    await close_brave_session()
+    await close_fetch_session()
+    await close_openai_client()
+
+
+app = FastAPI(title="Agentra Multi-Modal Fact Checker (Full)", lifespan=lifespan,
+              default_response_class=ORJSONResponse)
+
+_UPLOAD_CHUNK = 1024 * 1024  # stream uploads to disk 1 MiB at a time
 
 # ----- OPTIONAL: enable CORS if you call this API from a frontend on another origin -----
 # from fastapi.middleware.cors import CORSMiddleware
@@ -322,7 +343,8 @@ function render(data){
 
 @app.get("/healthz")
 async def healthz():
-    return {"ok": True}
+    return {"ok": True, "brave_cache": brave_cache_stats(), "llm_cache": llm_cache_stats(),
+            "result_cache": result_cache_stats()}
 
 @app.post("/factcheck")
 async def factcheck(
@@ -334,18 +356,19 @@ async def factcheck(
 ):
     paths = []
 
-    def save_upload(up: Optional[UploadFile]) -> Optional[str]:
+    async def save_upload(up: Optional[UploadFile]) -> Optional[str]:
         if up is None:
             return None
         p = os.path.join(tempfile.gettempdir(), f"_fc_{up.filename}")
-        with open(p, "wb") as f:
-            f.write(up.file.read())
         paths.append(p)
+        async with aiofiles.open(p, "wb") as f:
+            while chunk := await up.read(_UPLOAD_CHUNK):
+                await f.write(chunk)
         return p
 
-    img_path = save_upload(image)
-    aud_path = save_upload(audio)
-    vid_path = save_upload(video)
+    img_path = await save_upload(image)
+    aud_path = await save_upload(audio)
+    vid_path = await save_upload(video)
 
     audio_text: Optional[str] = None
     if aud_path:
@@ -360,9 +383,9 @@ async def factcheck(
             audio_text=audio_text,
             video_path=vid_path,
         )
-        return JSONResponse(result)
+        return ORJSONResponse(result)
     except Exception as e:
-        return JSONResponse({"error": str(e)}, status_code=400)
+        return ORJSONResponse({"error": str(e)}, status_code=400)
     finally:
         for p in paths:
             try: os.remove(p)
@@ -379,7 +402,6 @@ async def download_share(path: str):
 @app.get("/events")
 async def events():
     async def gen():
-        import json
         stages = [
             {"stage": "ingest", "message": "Reading inputs"},
             {"stage": "plan", "message": "Extracting subclaims & queries with GPT-5"},
@@ -390,6 +412,6 @@ async def events():
             {"stage": "done", "message": "Complete"},
         ]
         for s in stages:
-            yield f"data: {json.dumps(s)}\n\n"
+            yield b"data: " + orjson.dumps(s) + b"\n\n"
             await asyncio.sleep(0.4)
     return StreamingResponse(gen(), media_type="text/event-stream")
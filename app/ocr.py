@@ -1,12 +1,116 @@
 from typing import Optional
-from PIL import Image, ImageChops, ImageEnhance
-import pytesseract
-import io, os
+import logging
+import io, os, threading
+
+# cap libtesseract's OpenMP pool before the library is loaded
+os.environ.setdefault("OMP_THREAD_LIMIT", "4")
+
+from PIL import Image
+import numpy as np
+
+# Optional faster OCR engines
+try:
+    from paddleocr import PaddleOCR
+except ImportError:
+    PaddleOCR = None
+try:
+    import easyocr
+except ImportError:
+    easyocr = None
+
+log = logging.getLogger("ocr")
+
+# libjpeg-turbo handle, created on first use; False once it turned out to be unavailable
+_TJ = None
+
+def _turbojpeg():
+    """TurboJPEG instance, or None when PyTurboJPEG / libturbojpeg is missing (PIL is used then)."""
+    global _TJ
+    if _TJ is None:
+        try:
+            from turbojpeg import TurboJPEG
+            _TJ = TurboJPEG()
+        except Exception as e:  # ImportError, or OSError/RuntimeError when the library isn't found
+            log.warning("libjpeg-turbo unavailable (%s); ELA uses PIL", e)
+            _TJ = False
+    return _TJ or None
+
+def _jpeg_roundtrip(rgb: np.ndarray, quality: int) -> np.ndarray:
+    tj = _turbojpeg()
+    if tj is not None:
+        from turbojpeg import TJPF_RGB
+        return tj.decode(tj.encode(rgb, quality=quality, pixel_format=TJPF_RGB), pixel_format=TJPF_RGB)
+    buf = io.BytesIO()
+    Image.fromarray(rgb).save(buf, "JPEG", quality=quality)
+    buf.seek(0)
+    return np.asarray(Image.open(buf).convert("RGB"))
+
+# OCR engines hold native state and are not thread-safe: one instance, one lock
+_OCR_LOCK = threading.Lock()
+
+# In-process libtesseract (no subprocess per call), created on first use. tesserocr is
+# imported there too, so without it the app still starts and OCR just comes back empty.
+_TESS = None
+_BW_THRESHOLD = 180
+
+def _tess() -> "PyTessBaseAPI":
+    global _TESS
+    if _TESS is None:
+        from tesserocr import PyTessBaseAPI, PSM, OEM
+        # fixed block of text: skips automatic page-layout analysis
+        _TESS = PyTessBaseAPI(lang="eng", psm=PSM.SINGLE_BLOCK, oem=OEM.LSTM_ONLY)
+    return _TESS
+
+def _ocr_tesseract(path: str) -> str:
+    gray = np.asarray(Image.open(path).convert("L"))
+    # binarize once in NumPy so tesseract gets a small 1-channel input
+    bw = Image.fromarray(np.where(gray > _BW_THRESHOLD, 255, 0).astype(np.uint8))
+    with _OCR_LOCK:
+        api = _tess()
+        api.SetImage(bw)
+        return api.GetUTF8Text()
+
+def _ocr_paddle(path: str) -> str:
+    with _OCR_LOCK:
+        res = _ENGINE.ocr(path, cls=False)
+    # [[ [box, (text, score)], ... ] per page]
+    return "\n".join(line[1][0] for page in (res or []) for line in (page or []))
+
+def _ocr_easyocr(path: str) -> str:
+    with _OCR_LOCK:
+        return "\n".join(_ENGINE.readtext(path, detail=0))
+
+_BACKENDS = {"tesseract": _ocr_tesseract, "paddleocr": _ocr_paddle, "easyocr": _ocr_easyocr}
+
+def _load_engine(name: str):
+    """Preload the model at import so the first request doesn't pay for it."""
+    if name == "paddleocr" and PaddleOCR is not None:
+        return PaddleOCR(use_angle_cls=False, lang="en", show_log=False)
+    if name == "easyocr" and easyocr is not None:
+        return easyocr.Reader(["en"], gpu=False)
+    raise RuntimeError(f"OCR backend {name!r} is not installed")
+
+OCR_BACKEND = os.getenv("OCR_BACKEND", "paddleocr" if PaddleOCR is not None else "tesseract").lower()
+_ENGINE = None
+if OCR_BACKEND not in _BACKENDS:
+    log.warning("Unknown OCR_BACKEND=%s; using tesseract", OCR_BACKEND)
+    OCR_BACKEND = "tesseract"
+elif OCR_BACKEND != "tesseract":
+    try:
+        _ENGINE = _load_engine(OCR_BACKEND)
+    except Exception as e:
+        log.warning("OCR backend %s unavailable (%s); using tesseract", OCR_BACKEND, e)
+        OCR_BACKEND = "tesseract"
 
 def ocr_image(path: str) -> Optional[str]:
     try:
-        img = Image.open(path)
-        txt = pytesseract.image_to_string(img, lang="eng")
+        try:
+            txt = _BACKENDS[OCR_BACKEND](path)
+        except Exception as e:
+            if OCR_BACKEND == "tesseract":
+                raise
+            log.warning("%s OCR failed (%s); falling back to tesseract", OCR_BACKEND, e)
+            txt = _ocr_tesseract(path)
         txt = (txt or "").strip()
         return txt if txt else None
     except Exception:
@@ -15,17 +119,13 @@ def ocr_image(path: str) -> Optional[str]:
 def ela_heatmap(in_path: str, out_path: str, quality: int = 90) -> Optional[str]:
     """Simple Error Level Analysis heatmap (not a forensic guarantee)."""
     try:
-        original = Image.open(in_path).convert("RGB")
-        # recompress
-        tmp_jpg = io.BytesIO()
-        original.save(tmp_jpg, "JPEG", quality=quality)
-        tmp_jpg.seek(0)
-        recompressed = Image.open(tmp_jpg)
-        diff = ImageChops.difference(original, recompressed)
+        original = np.asarray(Image.open(in_path).convert("RGB"))
+        # recompress in memory (libjpeg-turbo when available)
+        recompressed = _jpeg_roundtrip(original, quality)
+        diff = np.abs(original.astype(np.int16) - recompressed)
         # boost differences
-        enhancer = ImageEnhance.Brightness(diff)
-        heat = enhancer.enhance(8.0)
-        heat.save(out_path)
+        heat = np.clip(diff * 8, 0, 255).astype(np.uint8)
+        Image.fromarray(heat).save(out_path)
         return out_path
     except Exception:
         return None
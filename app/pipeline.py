@@ -1,10 +1,11 @@
-import logging, asyncio, os, tempfile, time
+import logging, asyncio, os, random, re, tempfile, time
 from typing import Dict, Any, List, Optional
 
-
+from cachetools import TTLCache
+from openai import APIConnectionError, APIStatusError, RateLimitError
 
 from .ocr import ocr_image, ela_heatmap
-from .utils import clean_text
+from .utils import clean_text, dedupe_evidence, sha1, StatsCache
 from .fetch import fetch_url_text
 from .video import extract_keyframes
 from .report import make_pdf_report, make_share_card
@@ -13,111 +14,241 @@ from .entities import temporal_checks
 
 from .reasoning import (
     extract_claims_and_queries,
-    evaluate_evidence,
+    batch_entail,
+    fuse_votes,
+    error_votes,
     judge_entailment,
     analyst_notes,
     skeptic_notes,
     judge_from_notes,
+    format_claims,
+    format_evidence,
+    entail_sources,
 )
 
 
 from .retrieval import EvidenceRetriever
+from .ratelimit import TokenBucket
+from .config import OPENAI_RPM
 
 log = logging.getLogger("pipeline")
 
 # -------- Low-RPM knobs (env) --------
 LOW_RPM_MODE = os.getenv("OPENAI_LOW_RPM", "1") == "1"     # default ON for safety
-OPENAI_RPM = max(1, int(os.getenv("OPENAI_RPM", "3")))     # default 3 rpm
 DEBATE_ON = os.getenv("OPENAI_USE_DEBATE", "0") == "1"     # default OFF in low-rpm
 MAX_SUBCLAIMS = max(1, int(os.getenv("OPENAI_MAX_SUBCLAIMS", "1")))  # verify only 1 subclaim in low-rpm
 # spacing between requests (seconds): +1s buffer to be safe with clock skew
 OPENAI_INTERVAL = int(60 / OPENAI_RPM) + 1                 # e.g., 21s for 3 rpm
+OPENAI_BURST = max(1, int(os.getenv("OPENAI_BURST", "1")))  # calls allowed back-to-back
+OPENAI_MAX_RETRIES = max(0, int(os.getenv("OPENAI_MAX_RETRIES", "3")))  # transient-error retries per call
+
+# Shared across requests (FactChecker is built per request): refills one token
+# per OPENAI_INTERVAL, i.e. OPENAI_RPM/60 per second with the same safety spacing.
+_LLM_BUCKET = TokenBucket(rate=1.0 / OPENAI_INTERVAL, capacity=OPENAI_BURST)
+
+# -------- Fast paths (no model calls) --------
+# Whole results for text-only inputs, keyed on the ingested text
+_RESULT_CACHE = StatsCache(TTLCache(maxsize=max(1, int(os.getenv("RESULT_CACHE_MAX_ITEMS", "256"))),
+                                    ttl=int(os.getenv("RESULT_CACHE_TTL_SEC", "600"))))
+# Greetings / acknowledgements / a bare link: nothing to fact-check
+_NON_CLAIM_RE = re.compile(
+    r"^\s*(?:(?:hi|hello|hey|yo|thanks|thank you|ok|okay|test(?:ing)?|good (?:morning|evening|night))\b[\s!.?,]*"
+    r"|(?:https?://|www\.)\S+)\s*$",
+    re.IGNORECASE,
+)
+MIN_CLAIM_WORDS = 4
+# Ingested text is capped before planning to bound prompt size (long articles / OCR dumps)
+MAX_INPUT_CHARS = max(256, int(os.getenv("MAX_INPUT_CHARS", "8192")))
+
+
+def result_cache_stats() -> Dict[str, Any]:
+    return _RESULT_CACHE.stats()
+
+
+def _is_literal(text: str) -> bool:
+    return len(text.split()) < MIN_CLAIM_WORDS or bool(_NON_CLAIM_RE.match(text))
+
+
+def _literal_result(source: str, timings: Dict[str, int], keyframes: List[str],
+                    heatmap_path: Optional[str]) -> Dict[str, Any]:
+    """UNVERIFIED answer for inputs with no checkable claim, produced without any model call."""
+    judge = {"label": "UNVERIFIED", "confidence": 0.3,
+             "rationale": "Input is too short or does not state a checkable claim."}
+    debate = {"analyst": "", "skeptic": "", "judge": judge}
+    return {
+        "verdict": "UNVERIFIED",
+        "confidence": 0.3,
+        "subclaim_results": [],
+        "evidence": [],
+        "debate": debate,
+        "keyframes": keyframes,
+        "heatmap_path": heatmap_path,
+        "temporal_checks": [],
+        "suggested_corrections": [],
+        "retrieval_trace": {},
+        "reasoning_trace": [],
+        "adversarial_trace": debate,
+        "plan_raw": {},
+        "queries_used": [],
+        "meta": {
+            "source": source,
+            "model": "gpt-5",
+            "model_calls": 0,
+            "timings_ms": timings,
+            "evidence_domains": {},
+            "subclaims_count": 0,
+            "evidence_count": 0,
+            "low_rpm_mode": LOW_RPM_MODE,
+            "rpm_interval_sec": OPENAI_INTERVAL,
+            "debate_on": False,
+            "fast_path": "literal",
+        },
+        "share_card": None,
+        "pdf_report": None,
+    }
 
 
 class FactChecker:
     def __init__(self):
         self.retriever = EvidenceRetriever()
-        self._last_llm_ts = 0.0
+        self._bucket = _LLM_BUCKET
+        self._fallbacks: List[str] = []  # wrappers that returned their fallback this run
 
-    # -------- simple rate limiter + 429 retry helper for GPT calls --------
+    # -------- token-bucket rate limiter + 429 retry helper for GPT calls --------
     async def _await_slot(self):
-        """Wait so we respect RPM when LOW_RPM_MODE is enabled."""
+        """Take a token so we respect RPM when LOW_RPM_MODE is enabled."""
         if not LOW_RPM_MODE:
             return
-        now = time.time()
-        wait = (self._last_llm_ts + OPENAI_INTERVAL) - now
-        if wait > 0:
-            await asyncio.sleep(wait)
-        self._last_llm_ts = time.time()
+        await self._bucket.acquire()
 
-    async def _with_retry(self, coro_fn, *args, **kwargs):
+    @staticmethod
+    def _is_transient(e: Exception) -> bool:
+        # 429, connection resets/timeouts (APITimeoutError subclasses APIConnectionError) and 5xx
+        if isinstance(e, (RateLimitError, APIConnectionError)):
+            return True
+        return isinstance(e, APIStatusError) and e.status_code >= 500
+
+    async def _with_retry(self, coro_fn, *args, fallback: Any = None, **kwargs):
         """
-        Call an async GPT wrapper (extract_claims_and_queries / judge_entailment / adversarial_debate)
-        under rate limit and retry ONCE on 429 with a full interval sleep.
+        Call an async GPT wrapper (extract_claims_and_queries / judge_entailment / batch_entail /
+        debate notes) under rate limit, retrying transient errors up to OPENAI_MAX_RETRIES times with
+        truncated exponential backoff plus jitter (base = OPENAI_INTERVAL).
+        Once retries are exhausted `fallback` is returned when given, so the run still
+        produces a (partial) result, and the wrapper is recorded in self._fallbacks so
+        that result isn't cached; otherwise the error is raised.
+        Cached results (see cache.cached_async) are returned without taking a slot.
         """
-        await self._await_slot()
-        try:
-            return await coro_fn(*args, **kwargs)
-        except Exception as e:
-            msg = str(e)
-            if "rate_limit" in msg or "Rate limit" in msg or "429" in msg:
-                log.warning("Hit OpenAI rate limit. Sleeping %ss and retrying once...", OPENAI_INTERVAL)
-                await asyncio.sleep(OPENAI_INTERVAL + 1)
-                self._last_llm_ts = time.time()
+        lookup = getattr(coro_fn, "lookup", None)
+        if lookup is not None:
+            hit = await lookup(*args, **kwargs)
+            if hit is not None:
+                return hit
+        base = OPENAI_INTERVAL
+        for attempt in range(OPENAI_MAX_RETRIES + 1):
+            await self._await_slot()
+            try:
                 return await coro_fn(*args, **kwargs)
-            raise
+            except Exception as e:
+                if not self._is_transient(e):
+                    raise
+                if attempt == OPENAI_MAX_RETRIES:
+                    if fallback is None:
+                        raise
+                    log.warning("%s: retries exhausted (%s); using fallback", coro_fn.__name__, e)
+                    self._fallbacks.append(coro_fn.__name__)
+                    return fallback
+                delay = min(60, base * 2 ** attempt) + random.uniform(0, base)
+                log.warning("%s: transient OpenAI error (%s). Retry %d/%d in %.1fs",
+                            coro_fn.__name__, type(e).__name__, attempt + 1, OPENAI_MAX_RETRIES, delay)
+                await asyncio.sleep(delay)
 
     async def run(self, text: Optional[str] = None, image_path: Optional[str] = None,
                   url: Optional[str] = None, audio_text: Optional[str] = None,
                   video_path: Optional[str] = None) -> Dict[str, Any]:
         t0 = time.time()
         timings: Dict[str, int] = {}
+        self._fallbacks = []
 
-        # 1) Ingest
+        # 1) Ingest — URL fetch, OCR, keyframes and ELA are independent, so run them concurrently
         t_ing = time.time()
+
+        async def _timed(name: str, aw):
+            t = time.time()
+            try:
+                return await aw
+            finally:
+                timings[name] = int((time.time() - t) * 1000)
+
         raw_text = clean_text(text or "")
+        audio_clean = clean_text(audio_text or "")
+        heatmap_path = None
+        if image_path:
+            heatmap_path = os.path.join(tempfile.gettempdir(), f"ela_{os.path.basename(image_path)}.png")
+
+        # text > url > audio > image: only start the fallbacks that could still be needed
+        url_fut = fetch_url_text(url) if (not raw_text and url) else None
+        ocr_fut = (asyncio.to_thread(ocr_image, image_path)
+                   if (not raw_text and not audio_clean and image_path) else None)
+        kf_fut = (_timed("video_ms", asyncio.to_thread(
+                      extract_keyframes, video_path, tempfile.mkdtemp(prefix="keyframes_"), max_frames=5))
+                  if video_path else None)
+        ela_fut = (_timed("image_ms", asyncio.to_thread(ela_heatmap, image_path, heatmap_path))
+                   if image_path else None)
+        futs = {k: f for k, f in (("url", url_fut), ("ocr", ocr_fut), ("kf", kf_fut), ("ela", ela_fut)) if f}
+        done = dict(zip(futs, await asyncio.gather(*futs.values(), return_exceptions=True)))
+        for k, res in done.items():
+            if k != "url" and isinstance(res, BaseException):
+                raise res
+
         source = "text"
         if not raw_text and url:
             source = "url"
-            try:
-                raw_text = fetch_url_text(url)
-            except Exception as e:
-                log.warning("URL fetch failed: %s", e)
-        if not raw_text and audio_text:
+            url_res = done.get("url")
+            if isinstance(url_res, BaseException):
+                log.warning("URL fetch failed: %s", url_res)
+            else:
+                raw_text = url_res or ""
+        if not raw_text and audio_clean:
             source = "audio"
-            raw_text = clean_text(audio_text)
+            raw_text = audio_clean
         if not raw_text and image_path:
             source = "image"
-            ocr_txt = ocr_image(image_path)
-            raw_text = clean_text(ocr_txt or "")
+            raw_text = clean_text(done.get("ocr") or "")
         if not raw_text:
             raise ValueError("No usable text found. Provide text/image/url/audio.")
+        # already cleaned above, so cutting can at most leave a trailing space
+        raw_text = raw_text[:MAX_INPUT_CHARS].rstrip()
         timings["ingest_ms"] = int((time.time() - t_ing) * 1000)
+        timings.setdefault("video_ms", 0)
+        timings.setdefault("image_ms", 0)
         log.info("[Input] %s", raw_text[:400])
 
-        # Optional: keyframes if video provided
-        t_vid = time.time()
-        keyframes: List[str] = []
+        keyframes: List[str] = done.get("kf") or []
         visual_notes: List[str] = []
-        if video_path:
-            out_dir = tempfile.mkdtemp(prefix="keyframes_")
-            keyframes = extract_keyframes(video_path, out_dir, max_frames=5)
-            if keyframes:
-                visual_notes.append(f"{len(keyframes)} keyframes extracted")
-        timings["video_ms"] = int((time.time() - t_vid) * 1000)
-
-        # Optional: ELA heatmap for image
-        t_img = time.time()
-        heatmap_path = None
+        if keyframes:
+            visual_notes.append(f"{len(keyframes)} keyframes extracted")
         if image_path:
-            heatmap_path = os.path.join(tempfile.gettempdir(), f"ela_{os.path.basename(image_path)}.png")
-            ela_heatmap(image_path, heatmap_path)
             visual_notes.append("Image ELA heatmap generated")
-        timings["image_ms"] = int((time.time() - t_img) * 1000)
+
+        # Fast paths: nothing to check, or the same text was checked recently
+        if _is_literal(raw_text):
+            timings["total_ms"] = int((time.time() - t0) * 1000)
+            log.info("[FastPath] literal input, skipping planner and judge")
+            return _literal_result(source, timings, keyframes, heatmap_path)
+        # image/video results carry per-upload artefacts, so only text-only runs are reused
+        cache_key = sha1(raw_text) if not (image_path or video_path) else None
+        if cache_key:
+            hit = _RESULT_CACHE.get(cache_key)
+            if hit is not None:
+                log.info("[FastPath] cached result for identical input")
+                timings["total_ms"] = int((time.time() - t0) * 1000)
+                return {**hit, "meta": {**hit["meta"], "source": source, "timings_ms": timings,
+                                        "model_calls": 0, "fast_path": "cached"}}
 
         # 2) Plan subclaims and queries  (GPT-5)  [1 GPT call]
         t_plan = time.time()
-        plan = await self._with_retry(extract_claims_and_queries, raw_text)
+        plan = await self._with_retry(extract_claims_and_queries, raw_text,
+                                      fallback={"subclaims": [], "queries": []})
         subclaims = plan.get("subclaims", []) or [{"id": "C1", "text": raw_text[:280]}]
         queries = plan.get("queries", []) or [raw_text[:120]]
         timings["plan_ms"] = int((time.time() - t_plan) * 1000)
@@ -126,9 +257,15 @@ class FactChecker:
         # 3) Retrieval with ranking (Brave) — unaffected by OpenAI RPM
         t_ret = time.time()
         # keep it lighter to avoid Brave 429s
-        evidence_ranked, retrieval_trace = self.retriever.retrieve(queries, per_query=4, top_k=10)
+        evidence_ranked, retrieval_trace = await self.retriever.retrieve(queries, per_query=4, top_k=10)
+        n_raw = len(evidence_ranked)
+        evidence_ranked = dedupe_evidence(evidence_ranked)
+        retrieval_trace["duplicates_dropped"] = n_raw - len(evidence_ranked)
         timings["retrieve_ms"] = int((time.time() - t_ret) * 1000)
         log.info("[Evidence] %d ranked items", len(evidence_ranked))
+        # Shared prompt context, built once so every reasoning call sees the same prefix
+        claims_text = format_claims(subclaims)
+        ev_text, _ = format_evidence(evidence_ranked)
 
         # 3.5) Temporal/entity checks
         t_tmp = time.time()
@@ -144,7 +281,9 @@ class FactChecker:
             # Low-RPM path: use ONE GPT call per (limited) subclaim with judge_entailment
             limited_subclaims = subclaims[:MAX_SUBCLAIMS]
             for sc in limited_subclaims:
-                sc_label, sc_conf, sc_why = await self._with_retry(judge_entailment, sc.get("text", ""), evidence_ranked)
+                sc_label, sc_conf, sc_why = await self._with_retry(
+                    judge_entailment, sc.get("text", ""), claims_text, ev_text,
+                    fallback=("UNVERIFIED", 0.5, "retries_exhausted"))
                 sub_results.append({
                     "id": sc.get("id"),
                     "text": sc.get("text"),
@@ -165,9 +304,14 @@ class FactChecker:
                     "note": f"Low-RPM mode verified only the first {len(limited_subclaims)} of {len(subclaims)} subclaims."
                 })
         else:
-            # Normal path: triangulation + fusion (calls inside evaluate_evidence)
+            # Normal path: triangulation + fusion over one batched entailment call per subclaim
+            sources = entail_sources(evidence_ranked)
+            source_ids = tuple(i for i, _ in sources)
             for sc in subclaims:
-                res = await evaluate_evidence(sc.get("text", ""), evidence_ranked, visual_notes=visual_notes or None)
+                votes = await self._with_retry(
+                    batch_entail, sc.get("text", ""), claims_text, ev_text, source_ids,
+                    fallback=error_votes(sources))
+                res = fuse_votes(votes, sources, visual_notes=visual_notes or None)
                 sub_results.append({
                     "id": sc.get("id"),
                     "text": sc.get("text"),
@@ -187,22 +331,18 @@ class FactChecker:
 
         # 5) Adversarial Self-Check (Analyst/Skeptic/Judge)
 
-        # 5) Adversarial Self-Check (sequential to respect RPM)
+        # 5) Adversarial Self-Check (Analyst + Skeptic concurrently, then Judge)
         t_deb = time.time()
-        if True:  # debate always on, sequential + rate-limited
-            # Analyst
-            analyst_text = await self._with_retry(analyst_notes, subclaims, evidence_ranked)
-            # space calls under LOW_RPM
-            if LOW_RPM_MODE:
-                await asyncio.sleep(OPENAI_INTERVAL)
-
-            # Skeptic
-            skeptic_text = await self._with_retry(skeptic_notes, subclaims, evidence_ranked)
-            if LOW_RPM_MODE:
-                await asyncio.sleep(OPENAI_INTERVAL)
+        if True:  # debate always on, rate-limited
+            # Analyst and Skeptic are independent; under LOW_RPM they share the token bucket
+            analyst_task = asyncio.create_task(self._with_retry(analyst_notes, claims_text, ev_text, fallback=""))
+            skeptic_task = asyncio.create_task(self._with_retry(skeptic_notes, claims_text, ev_text, fallback=""))
+            analyst_text, skeptic_text = await asyncio.gather(analyst_task, skeptic_task)
 
             # Judge
-            judge_json = await self._with_retry(judge_from_notes, analyst_text, skeptic_text)
+            judge_json = await self._with_retry(
+                judge_from_notes, analyst_text, skeptic_text,
+                fallback={"label": "UNVERIFIED", "confidence": 0.5, "rationale": "retries_exhausted"})
             debate = {"analyst": analyst_text, "skeptic": skeptic_text, "judge": judge_json}
         else:
             # (kept for reference; not used now)
@@ -211,18 +351,6 @@ class FactChecker:
 
 
 
-        # Final decision (combine triangulation result & judge)
-        if sub_results and all(r["label"] == "TRUE" for r in sub_results):
-            final_label = "TRUE"
-            final_conf = min(0.95, sum(r["confidence"] for r in sub_results) / len(sub_results))
-        elif sub_results and any(r["label"] == "FAKE" and r["confidence"] >= 0.7 for r in sub_results):
-            final_label = "FAKE"
-            final_conf = max(r["confidence"] for r in sub_results if r["label"] == "FAKE")
-        else:
-            final_label = debate["judge"].get("label", "UNVERIFIED")
-            final_conf = float(debate["judge"].get("confidence", 0.55))
-
-
         # Final decision (combine subclaim signals & Judge) with partial-eval guard
         judge_label = debate["judge"].get("label", "UNVERIFIED")
         judge_conf  = float(debate["judge"].get("confidence", 0.55))
@@ -231,19 +359,24 @@ class FactChecker:
         # DO NOT declare TRUE based on the partial set; defer to the Judge.
         partial_eval = len(sub_results) < len(subclaims)
 
-        if not partial_eval and sub_results and all((r["label"] or "").upper() == "TRUE" for r in sub_results):
-            final_label = "TRUE"
-            final_conf = min(0.95, sum(r["confidence"] for r in sub_results) / len(sub_results))
-        elif sub_results and any((r["label"] or "").upper() == "FAKE" and r["confidence"] >= 0.7 for r in sub_results):
-            final_label = "FAKE"
-            final_conf = max(r["confidence"] for r in sub_results if (r["label"] or "").upper() == "FAKE")
+        # one pass over the subclaim results, then branch on the scalars
+        n_true, conf_sum, fake_conf = 0, 0.0, None
+        for r in sub_results:
+            lab, c = (r["label"] or "").upper(), r["confidence"]
+            conf_sum += c
+            if lab == "TRUE":
+                n_true += 1
+            elif lab == "FAKE" and c >= 0.7 and (fake_conf is None or c > fake_conf):
+                fake_conf = c
+
+        if not partial_eval and sub_results and n_true == len(sub_results):
+            final_label, final_conf = "TRUE", min(0.95, conf_sum / len(sub_results))
+        elif fake_conf is not None:
+            final_label, final_conf = "FAKE", fake_conf
         else:
             # Default to the Judge's holistic view
             final_label, final_conf = judge_label, judge_conf
 
-
-
-
         # Adjust for strong temporal mismatch (e.g., wrong year)
         suggested_corrections: List[Dict[str, Any]] = []
         for c in temp_checks:
@@ -261,9 +394,11 @@ class FactChecker:
 
         # 6) Reporting assets
         t_rep = time.time()
-        share_card = os.path.join(tempfile.gettempdir(), "share_card.png")
+        # per-run directory: cached results keep pointing at their own card/PDF
+        report_dir = tempfile.mkdtemp(prefix="report_")
+        share_card = os.path.join(report_dir, "share_card.png")
         make_share_card(final_label, final_conf, subclaims[0].get("text", "Claim"), share_card)
-        pdf_path = os.path.join(tempfile.gettempdir(), "factcheck_report.pdf")
+        pdf_path = os.path.join(report_dir, "factcheck_report.pdf")
         make_pdf_report({
             "verdict": final_label,
             "confidence": final_conf,
@@ -284,8 +419,8 @@ class FactChecker:
             # 1 planner + MAX_SUBCLAIMS judge + (optional) 1 debate-bundle
             model_calls = 1 + min(MAX_SUBCLAIMS, len(subclaims)) + (1 if DEBATE_ON else 0)
         else:
-            # 1 planner + per-source entails (inside evaluate_evidence) + debate (3)
-            model_calls = 1 + len(subclaims) * (1 + min(8, len(evidence_ranked))) + 2
+            # 1 planner + one batched entailment per subclaim + debate (3)
+            model_calls = 1 + len(subclaims) + 3
 
         timings["total_ms"] = int((time.time() - t0) * 1000)
 
@@ -329,12 +464,19 @@ class FactChecker:
         }
 
         if LOW_RPM_MODE:
-            out["reasoning_trace"].append({"note": "LOW_RPM_MODE enabled: sequential GPT calls with spacing to respect RPM."})
+            out["reasoning_trace"].append({"note": "LOW_RPM_MODE enabled: GPT calls gated by a shared token bucket to respect RPM."})
 
         if partial_eval:
             out.setdefault("meta", {}).update({
                 "consistency_note": "Partial subclaim evaluation in low-RPM mode — overall verdict taken from Judge."
             })
 
+        if self._fallbacks:
+            out["meta"]["fallbacks_used"] = list(self._fallbacks)
+        # Cache complete runs only: every model stage answered (none fell back after retries)
+        # and every search returned in time. A degraded run must not be pinned for the TTL.
+        if cache_key and not self._fallbacks and not retrieval_trace.get("timed_out"):
+            _RESULT_CACHE.set(cache_key, out)
+
         log.info("[Output] verdict=%s conf=%.2f", final_label, final_conf)
         return out
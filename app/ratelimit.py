@@ -0,0 +1,38 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Async token bucket: `capacity` calls may start immediately, then tokens refill
+    at `rate` per second. Waiters sleep on an asyncio.Condition until the next token
+    is due (no polling) and are woken as soon as one is left over.
+    Process-local; all callers must share the same event loop.
+    """
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = max(1e-6, float(rate))
+        self.capacity = max(1, int(capacity))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._cond = asyncio.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        async with self._cond:
+            while True:
+                self._refill()
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    if self._tokens >= 1.0:
+                        # burst capacity left: let the next waiter through too
+                        self._cond.notify()
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+                try:
+                    await asyncio.wait_for(self._cond.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
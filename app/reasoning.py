@@ -4,18 +4,50 @@ import asyncio
 import re
 from typing import List, Dict, Any, Tuple, Optional
 
-from openai import OpenAI
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # stdlib fallback
+    orjson = None
+    _json_loads = json.loads
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 from .config import OPENAI_API_KEY, MAX_PARALLEL
+from .cache import cached_async, literal_gate, text_key
+from .utils import sha1, clean_text
 
 
 MODEL = "gpt-5"
+# Analyst/Skeptic notes are streamed; set this to cut them off at that many chars (0 = no cap)
+NOTES_MAX_CHARS = int(os.getenv("NOTES_MAX_CHARS", "0"))
 
 
-def _client() -> OpenAI:
-    key = OPENAI_API_KEY
-    if not key:
-        raise RuntimeError("Missing OPENAI_API_KEY")
-    return OpenAI(api_key=key)
+_aclient: Optional[AsyncOpenAI] = None
+
+
+def _client() -> AsyncOpenAI:
+    """Process-wide async client: one HTTP/2 connection pool shared by every model call."""
+    global _aclient
+    if _aclient is None:
+        key = OPENAI_API_KEY
+        if not key:
+            raise RuntimeError("Missing OPENAI_API_KEY")
+        _aclient = AsyncOpenAI(
+            api_key=key,
+            http_client=DefaultAsyncHttpxClient(
+                http2=True,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+            ),
+        )
+    return _aclient
+
+
+async def close_client():
+    global _aclient
+    if _aclient is not None:
+        await _aclient.close()
+        _aclient = None
 
 
 def _get_text(resp) -> str:
@@ -34,20 +66,60 @@ def _get_text(resp) -> str:
         return ""
 
 
-def _responses_create_sync(prompt: str) -> str:
+async def _responses_create_async(prompt: str) -> str:
     """Single place to call the Responses API without extra/unstable params."""
-    client = _client()
-    resp = client.responses.create(model=MODEL, input=prompt)
+    resp = await _client().responses.create(model=MODEL, input=prompt)
     return _get_text(resp)
 
 
+async def _responses_stream_async(prompt: str, max_chars: int = 0) -> str:
+    """
+    Streamed variant for the debate notes: text is collected as deltas arrive and, with
+    max_chars, the stream is closed once enough has come in (trimmed to the last full
+    line), so the judge isn't kept waiting on a long tail it barely uses.
+    """
+    parts: List[str] = []
+    total = 0
+    async with _client().responses.stream(model=MODEL, input=prompt) as stream:
+        async for event in stream:
+            if event.type != "response.output_text.delta":
+                continue
+            parts.append(event.delta)
+            total += len(event.delta)
+            if max_chars and total >= max_chars:
+                text = "".join(parts)
+                cut = text.rfind("\n")
+                return text[:cut] if cut > 0 else text
+    return "".join(parts)
+
+
+# Greedy spans: first "{" (or "[") to the last matching closer, like the old find/rfind grab
+_JSON_OBJ_RE = re.compile(r"\{.*\}", re.DOTALL)
+_JSON_ARR_RE = re.compile(r"\[.*\]", re.DOTALL)
+
+
+def _loads_loose(raw: str, span_re: "re.Pattern" = _JSON_OBJ_RE) -> Any:
+    """Parse a model reply as JSON, else the outermost JSON span inside it; None if neither parses."""
+    try:
+        return _json_loads(raw)
+    except (ValueError, TypeError):
+        pass
+    m = span_re.search(raw or "")
+    if m:
+        try:
+            return _json_loads(m.group(0))
+        except ValueError:
+            pass
+    return None
+
+
 # Limit concurrent model calls
 _SEM = asyncio.Semaphore(max(1, int(MAX_PARALLEL or 4)))
 
 
-async def extract_claims_and_queries(text: str) -> Dict[str, Any]:
-    """Planner: subclaims + queries (JSON enforced by instruction)."""
-    prompt = f"""You are a multi-modal fact-checking planner.
+# --- Prompt templates (built once; filled with str.format per call) ---
+
+_PLANNER_TMPL = """You are a multi-modal fact-checking planner.
 
 INPUT CONTENT:
 {text}
@@ -63,37 +135,24 @@ Return ONLY valid JSON (no extra text):
   "queries": ["...", "..."]
 }}
 """
-    async with _SEM:
-        raw = await asyncio.to_thread(_responses_create_sync, prompt)
 
-    try:
-        js = json.loads(raw)
-        if isinstance(js, dict) and "subclaims" in js and "queries" in js:
-            return js
-    except Exception:
-        pass
+# Analyst, Skeptic, entailment and judge prompts all open with the same SUBCLAIMS/EVIDENCE
+# block and keep the role-specific instruction last, so the prompt prefix is byte-identical
+# across the calls of one run and the server side can reuse it (prompt caching).
+_CONTEXT_TMPL = """You are part of a rigorous fact-checking panel.
 
-    return {
-        "subclaims": [{"id": "C1", "text": text[:300]}],
-        "queries": [text[:120]],
-    }
+SUBCLAIMS:
+{claims}
 
+EVIDENCE (independent sources, may agree or conflict):
+{ev}
 
-async def judge_entailment(subclaim: str, evidence: List[Dict[str, str]]) -> Tuple[str, float, str]:
-    """Single verdict on a subclaim using the whole evidence pool."""
-    sources = "\n\n".join(
-        [f"- {e.get('title')}: {e.get('snippet')} (URL: {e.get('url')})" for e in evidence]
-    )
-    prompt = f"""You are a rigorous fact-checking judge.
+"""
 
-SUBCLAIM:
+_JUDGE_ENTAIL_TMPL = """ROLE: Judge
+Decide TRUE, FAKE, or UNVERIFIED for this SUBCLAIM based ONLY on the evidence snippets above:
 "{subclaim}"
 
-EVIDENCE (independent sources, may agree or conflict):
-{sources}
-
-TASK:
-- Decide TRUE, FAKE, or UNVERIFIED based ONLY on the above evidence snippets.
 - Provide a short rationale (2–3 sentences).
 - Provide a confidence 0..1 based on agreement, quality, and recency.
 
@@ -105,69 +164,31 @@ Return ONLY valid JSON:
   "rationale": "..."
 }}
 """
-    async with _SEM:
-        raw = await asyncio.to_thread(_responses_create_sync, prompt)
-
-    try:
-        data = json.loads(raw)
-    except Exception:
-        # try loose JSON grab
-        start, end = raw.find("{"), raw.rfind("}")
-        if start != -1 and end != -1 and end > start:
-            try:
-                data = json.loads(raw[start:end+1])
-            except Exception:
-                data = None
-        else:
-            data = None
-
-    if not isinstance(data, dict):
-        return ("UNVERIFIED", 0.5, "Insufficient or ambiguous evidence.")
-
-    label = str(data.get("label", "UNVERIFIED")).upper()
-    conf = float(data.get("confidence", 0.5))
-    why = data.get("rationale", "")
-    if label not in ("TRUE", "FAKE", "UNVERIFIED"):
-        label = "UNVERIFIED"
-    return (label, conf, why)
 
-
-async def adversarial_debate(subclaims: List[Dict[str, Any]], evidence: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """Three-agent debate: Analyst, Skeptic, Judge → final JSON verdict."""
-    ev_text = "\n".join([f"* {e['title']} — {e['snippet']} ({e['url']})" for e in evidence[:12]])
-    claims_text = "\n".join([f"- [{c.get('id','C?')}] {c.get('text','')}" for c in subclaims])
-
-    analyst_prompt = f"""ROLE: Analyst
+_ANALYST_TMPL = """ROLE: Analyst
 Build the best confirming case for the subclaims using the evidence.
 
-SUBCLAIMS:
-{claims_text}
-
-EVIDENCE:
-{ev_text}
-
 OUTPUT:
 - Bullet points only.
 """
-    skeptic_prompt = f"""ROLE: Skeptic
-Build the strongest refutation and highlight weaknesses.
 
-SUBCLAIMS:
-{claims_text}
-
-EVIDENCE:
-{ev_text}
+_SKEPTIC_TMPL = """ROLE: Skeptic
+Build the strongest refutation and highlight weaknesses.
 
 OUTPUT:
 - Bullet points only.
 """
 
-    async with _SEM:
-        analyst_text = await asyncio.to_thread(_responses_create_sync, analyst_prompt)
-    async with _SEM:
-        skeptic_text = await asyncio.to_thread(_responses_create_sync, skeptic_prompt)
+_ENTAIL_BATCH_TMPL = """TASK: For EACH of the EVIDENCE sources numbered {ids}, decide whether its snippet entails this SUBCLAIM:
+"{subclaim}"
 
-    judge_prompt = f"""ROLE: Judge
+Return ONLY a valid JSON array of length {n}, one object per listed source ("id" = its number):
+[
+  {{"id": {first}, "label": "SUPPORTS|REFUTES|NEUTRAL", "confidence": 0.0, "rationale": "..."}}
+]
+"""
+
+_JUDGE_NOTES_TMPL = """ROLE: Judge
 Read Analyst and Skeptic notes and issue a final verdict for the entire claim set.
 
 RESPONSE:
@@ -179,26 +200,120 @@ Return ONLY valid JSON:
 }}
 
 Analyst:
-{analyst_text}
+{analyst}
 
 Skeptic:
-{skeptic_text}
+{skeptic}
 """
+
+
+@cached_async(lambda text: text_key(text),
+              semantic_fn=lambda text: (clean_text(text), literal_gate(text)))
+async def extract_claims_and_queries(text: str) -> Dict[str, Any]:
+    """Planner: subclaims + queries (JSON enforced by instruction)."""
+    prompt = _PLANNER_TMPL.format(text=text)
     async with _SEM:
-        judge_raw = await asyncio.to_thread(_responses_create_sync, judge_prompt)
+        raw = await _responses_create_async(prompt)
 
-    try:
-        judge_data = json.loads(judge_raw)
-    except Exception:
-        start, end = judge_raw.find("{"), judge_raw.rfind("}")
-        if start != -1 and end != -1 and end > start:
-            try:
-                judge_data = json.loads(judge_raw[start:end+1])
-            except Exception:
-                judge_data = None
-        else:
-            judge_data = None
+    js = _loads_loose(raw)
+    if isinstance(js, dict) and "subclaims" in js and "queries" in js:
+        return js
+
+    return {
+        "subclaims": [{"id": "C1", "text": text[:300]}],
+        "queries": [text[:120]],
+    }
+
+
+# --- Shared prompt context ---
+
+EVIDENCE_LIMIT = 12
+# Per-source entailment votes over the top-ranked sources only (the triangulation input)
+ENTAIL_SOURCE_LIMIT = 8
+
+
+def format_claims(subclaims: List[Dict[str, Any]]) -> str:
+    return "\n".join(f"- [{c.get('id','C?')}] {c.get('text','')}" for c in subclaims)
+
+
+def format_evidence(evidence: List[Dict[str, Any]], limit: int = EVIDENCE_LIMIT) -> Tuple[str, int]:
+    """
+    Top-`limit` ranked items as one numbered block → (ev_text, n_sources).
+    Items are ordered by (host, url hash) so the same evidence set always renders
+    to the same bytes regardless of small rank changes.
+    """
+    items = [evidence[r] for r in _block_order(evidence, limit)]
+    ev_text = "\n".join(
+        f"[{i}] {e.get('title','')} — {e.get('snippet','')} ({e.get('url','')}) "
+        f"credibility={e.get('credibility')} freshness={e.get('freshness')}"
+        for i, e in enumerate(items)
+    )
+    return ev_text, len(items)
+
+
+def _block_order(evidence: List[Dict[str, Any]], limit: int) -> List[int]:
+    """Ranks of the top-`limit` items in the order format_evidence numbers them."""
+    return sorted(range(min(limit, len(evidence))),
+                  key=lambda r: (evidence[r].get("host") or "", sha1(evidence[r].get("url") or "")))
+
+
+def entail_sources(evidence: List[Dict[str, Any]], limit: int = ENTAIL_SOURCE_LIMIT,
+                   block_limit: int = EVIDENCE_LIMIT) -> List[Tuple[int, str]]:
+    """
+    The top-`limit` ranked items as (number in the format_evidence block, url), in rank order:
+    the sources batch_entail votes on.
+    """
+    block_id = {r: i for i, r in enumerate(_block_order(evidence, block_limit))}
+    return [(block_id[r], evidence[r].get("url") or "") for r in range(min(limit, len(block_id)))]
 
+
+def _context_prefix(claims_text: str, ev_text: str) -> str:
+    return _CONTEXT_TMPL.format(claims=claims_text, ev=ev_text)
+
+
+def _context_key(claims_text: str, ev_text: str) -> str:
+    return sha1(f"{claims_text}|{ev_text}")
+
+
+@cached_async(lambda subclaim, claims_text, ev_text: f"{text_key(subclaim)}|{_context_key(claims_text, ev_text)}",
+              semantic_fn=lambda subclaim, claims_text, ev_text: (
+                  clean_text(subclaim), f"{_context_key(claims_text, ev_text)}|{literal_gate(subclaim)}"))
+async def judge_entailment(subclaim: str, claims_text: str, ev_text: str) -> Tuple[str, float, str]:
+    """Single verdict on a subclaim using the whole (shared) evidence block."""
+    prompt = _context_prefix(claims_text, ev_text) + _JUDGE_ENTAIL_TMPL.format(subclaim=subclaim)
+    async with _SEM:
+        raw = await _responses_create_async(prompt)
+
+    data = _loads_loose(raw)
+    if not isinstance(data, dict):
+        return ("UNVERIFIED", 0.5, "Insufficient or ambiguous evidence.")
+
+    label = str(data.get("label", "UNVERIFIED")).upper()
+    conf = float(data.get("confidence", 0.5))
+    why = data.get("rationale", "")
+    if label not in ("TRUE", "FAKE", "UNVERIFIED"):
+        label = "UNVERIFIED"
+    return (label, conf, why)
+
+
+async def adversarial_debate(subclaims: List[Dict[str, Any]], evidence: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Three-agent debate: Analyst, Skeptic, Judge → final JSON verdict."""
+    claims_text = format_claims(subclaims)
+    ev_text, _ = format_evidence(evidence)
+    prefix = _context_prefix(claims_text, ev_text)
+    analyst_prompt = prefix + _ANALYST_TMPL
+    skeptic_prompt = prefix + _SKEPTIC_TMPL
+
+    async with _SEM:
+        analyst_text = await _responses_create_async(analyst_prompt)
+    async with _SEM:
+        skeptic_text = await _responses_create_async(skeptic_prompt)
+
+    judge_prompt = _JUDGE_NOTES_TMPL.format(analyst=analyst_text, skeptic=skeptic_text)
+    async with _SEM:
+        judge_raw = await _responses_create_async(judge_prompt)
+
+    judge_data = _loads_loose(judge_raw)
     if not isinstance(judge_data, dict):
         judge_data = {"label": "UNVERIFIED", "confidence": 0.5, "rationale": "Debate inconclusive."}
 
@@ -213,138 +328,115 @@ Skeptic:
 
 # --- Sequential debate helpers (rate-limit friendly) ---
 
-async def analyst_notes(subclaims: List[Dict[str, Any]], evidence: List[Dict[str, Any]]) -> str:
-    ev_text = "\n".join([f"* {e.get('title','')} — {e.get('snippet','')} ({e.get('url','')})" for e in evidence[:12]])
-    claims_text = "\n".join([f"- [{c.get('id','C?')}] {c.get('text','')}" for c in subclaims])
-    prompt = f"""ROLE: Analyst
-Build the best confirming case for the subclaims using the evidence.
-
-SUBCLAIMS:
-{claims_text}
-
-EVIDENCE:
-{ev_text}
-
-OUTPUT:
-- Bullet points only.
-"""
-    raw = await asyncio.to_thread(_responses_create_sync, prompt)
+@cached_async(lambda claims_text, ev_text: _context_key(claims_text, ev_text))
+async def analyst_notes(claims_text: str, ev_text: str) -> str:
+    prompt = _context_prefix(claims_text, ev_text) + _ANALYST_TMPL
+    async with _SEM:
+        raw = await _responses_stream_async(prompt, NOTES_MAX_CHARS)
     return raw.strip()
 
 
-async def skeptic_notes(subclaims: List[Dict[str, Any]], evidence: List[Dict[str, Any]]) -> str:
-    ev_text = "\n".join([f"* {e.get('title','')} — {e.get('snippet','')} ({e.get('url','')})" for e in evidence[:12]])
-    claims_text = "\n".join([f"- [{c.get('id','C?')}] {c.get('text','')}" for c in subclaims])
-    prompt = f"""ROLE: Skeptic
-Build the strongest refutation and highlight weaknesses.
-
-SUBCLAIMS:
-{claims_text}
-
-EVIDENCE:
-{ev_text}
-
-OUTPUT:
-- Bullet points only.
-"""
-    raw = await asyncio.to_thread(_responses_create_sync, prompt)
+@cached_async(lambda claims_text, ev_text: _context_key(claims_text, ev_text))
+async def skeptic_notes(claims_text: str, ev_text: str) -> str:
+    prompt = _context_prefix(claims_text, ev_text) + _SKEPTIC_TMPL
+    async with _SEM:
+        raw = await _responses_stream_async(prompt, NOTES_MAX_CHARS)
     return raw.strip()
 
 
+@cached_async(lambda analyst_text, skeptic_text: sha1(f"{analyst_text}|{skeptic_text}"))
 async def judge_from_notes(analyst_text: str, skeptic_text: str) -> Dict[str, Any]:
-    prompt = f"""ROLE: Judge
-Read Analyst and Skeptic notes and issue a final verdict for the entire claim set.
-
-RESPONSE:
-Return ONLY valid JSON:
-{{
-  "label": "TRUE|FAKE|UNVERIFIED",
-  "confidence": 0.0,
-  "rationale": "..."
-}}
-
-Analyst:
-{analyst_text}
-
-Skeptic:
-{skeptic_text}
-"""
-    raw = await asyncio.to_thread(_responses_create_sync, prompt)
-    # Parse JSON leniently
-    try:
-        return json.loads(raw)
-    except Exception:
-        s, e = raw.find("{"), raw.rfind("}")
-        if s != -1 and e != -1 and e > s:
-            try:
-                return json.loads(raw[s:e+1])
-            except Exception:
-                pass
+    prompt = _JUDGE_NOTES_TMPL.format(analyst=analyst_text, skeptic=skeptic_text)
+    async with _SEM:
+        raw = await _responses_create_async(prompt)
+    data = _loads_loose(raw)
+    if isinstance(data, dict):
+        return data
     return {"label": "UNVERIFIED", "confidence": 0.55, "rationale": "Debate JSON parse failed."}
 
 
 
 # -------- New: Evidence Reasoning with Triangulation & Fusion --------
 
-async def _per_source_entail(subclaim: str, item: Dict[str, Any]) -> Dict[str, Any]:
+_ENTAIL_LABELS = ("SUPPORTS", "REFUTES", "NEUTRAL")
+
+
+@cached_async(lambda subclaim, claims_text, ev_text, source_ids:
+              f"{text_key(subclaim)}|{_context_key(claims_text, ev_text)}|{','.join(map(str, source_ids))}")
+async def batch_entail(subclaim: str, claims_text: str, ev_text: str,
+                        source_ids: Tuple[int, ...]) -> List[Dict[str, Any]]:
     """
-    Ask the model for entailment on a single source → {label, confidence, why}.
+    Ask the model for entailment on the sources of `ev_text` numbered `source_ids` in ONE call
+    → [{label, confidence, why}, ...] (same order as `source_ids`; sources the model skipped
+    come back NEUTRAL).
     """
-    prompt = f"""Decide whether the SOURCE snippet entails the SUBCLAIM.
+    if not source_ids:
+        return []
+    prompt = _context_prefix(claims_text, ev_text) + _ENTAIL_BATCH_TMPL.format(
+        subclaim=subclaim, ids=", ".join(map(str, source_ids)), n=len(source_ids), first=source_ids[0])
+    async with _SEM:
+        raw = await _responses_create_async(prompt)
+    data = _loads_loose(raw, _JSON_ARR_RE)
+    if not isinstance(data, list):
+        data = []
+
+    by_id: Dict[int, Dict[str, Any]] = {}
+    for pos, d in enumerate(data):
+        if not isinstance(d, dict):
+            continue
+        try:
+            idx = int(d.get("id", pos))
+        except (TypeError, ValueError):
+            idx = pos
+        by_id.setdefault(idx, d)
 
-SUBCLAIM:
-"{subclaim}"
+    votes = []
+    for i in source_ids:
+        d = by_id.get(i)
+        if d is None:
+            votes.append({"label": "NEUTRAL", "confidence": 0.5, "why": "missing"})
+            continue
+        label = str(d.get("label", "NEUTRAL")).upper()
+        if label not in _ENTAIL_LABELS:
+            label = "NEUTRAL"
+        try:
+            conf = float(d.get("confidence", 0.5))
+        except (TypeError, ValueError):
+            conf = 0.5
+        votes.append({"label": label, "confidence": conf, "why": d.get("rationale", "")})
+    return votes
 
-SOURCE:
-Title: {item.get('title')}
-Snippet: {item.get('snippet')}
-URL: {item.get('url')}
-Meta: credibility={item.get('credibility')} freshness={item.get('freshness')}
 
-Return ONLY valid JSON:
-{{
-  "label": "SUPPORTS|REFUTES|NEUTRAL",
-  "confidence": 0.0,
-  "rationale": "..."
-}}
-"""
-    raw = await asyncio.to_thread(_responses_create_sync, prompt)
-    try:
-        data = json.loads(raw)
-    except Exception:
-        start, end = raw.find("{"), raw.rfind("}")
-        data = json.loads(raw[start:end+1]) if (start != -1 and end != -1 and end > start) else {}
-    label = str(data.get("label", "NEUTRAL")).upper()
-    conf = float(data.get("confidence", 0.5))
-    why = data.get("rationale", "")
-    if label not in ("SUPPORTS", "REFUTES", "NEUTRAL"):
-        label = "NEUTRAL"
-    return {"label": label, "confidence": conf, "why": why}
+async def evaluate_evidence(subclaim: str, claims_text: str, ev_text: str, sources: List[Tuple[int, str]],
+                            visual_notes: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Per-subclaim evaluation of the top-ranked `sources` (see entail_sources) against the
+    shared evidence block: one batch_entail call, then fuse_votes. Model errors propagate,
+    so the caller decides on retries/fallbacks.
+    """
+    votes = await batch_entail(subclaim, claims_text, ev_text, tuple(i for i, _ in sources))
+    return fuse_votes(votes, sources, visual_notes)
 
 
-async def evaluate_evidence(subclaim: str, evidence_ranked: List[Dict[str, Any]], visual_notes: Optional[List[str]] = None) -> Dict[str, Any]:
+def error_votes(sources: List[Tuple[int, str]]) -> List[Dict[str, Any]]:
+    """NEUTRAL placeholder votes for when the entailment call failed."""
+    return [{"label": "NEUTRAL", "confidence": 0.5, "why": "error"} for _ in sources]
+
+
+def fuse_votes(votes: List[Dict[str, Any]], sources: List[Tuple[int, str]],
+               visual_notes: Optional[List[str]] = None) -> Dict[str, Any]:
     """
-    Per-subclaim evaluation across sources with triangulation + (optional) visual fusion.
+    Triangulation + (optional) visual fusion over batch_entail votes.
     Returns:
       {
         "final": {"label": "TRUE|FAKE|UNVERIFIED", "confidence": float, "rationale": str},
-        "votes": [... per-source entailments ...],
+        "votes": [... per-source entailments, rank order, each with rank + url ...],
         "fusion_notes": "...",
         "rule": "explanation of how decision was made"
       }
     """
-    # Per-source entailments (limit to top 8 to control latency)
-    tasks = []
-    for it in evidence_ranked[:8]:
-        tasks.append(_per_source_entail(subclaim, it))
-
-    votes = []
-    for fut in asyncio.as_completed(tasks):
-        try:
-            res = await fut
-            votes.append(res)
-        except Exception:
-            votes.append({"label": "NEUTRAL", "confidence": 0.5, "why": "error"})
+    # new dicts: the cached vote list stays untouched
+    votes = [{**v, "rank": r, "url": url} for r, (v, (_, url)) in enumerate(zip(votes, sources))]
 
     # Triangulation rule:
     # - If >=2 SUPPORTS with avg confidence >= 0.65 => TRUE
@@ -4,21 +4,47 @@ from reportlab.pdfgen import canvas
 from reportlab.lib.units import cm
 from reportlab.lib.utils import ImageReader
 from PIL import Image, ImageDraw, ImageFont
-import os, io
+import os, io, textwrap
 from .config import APP_BRAND
 
+# Loaded once; falls back to PIL's bitmap font where DejaVu isn't installed
+try:
+    _FONT_TITLE = ImageFont.truetype("DejaVuSans-Bold.ttf", 48)
+    _FONT_BODY = ImageFont.truetype("DejaVuSans.ttf", 28)
+except OSError:
+    _FONT_TITLE = _FONT_BODY = ImageFont.load_default()
+
 def make_share_card(verdict: str, confidence: float, title: str, out_path: str) -> str:
     W, H = 1200, 630
     img = Image.new("RGB", (W, H), (255,255,255))
     d = ImageDraw.Draw(img)
     # simple layout
     d.rectangle([(0,0),(W, 120)], fill=(240,240,240))
-    d.text((40, 40), APP_BRAND, fill=(0,0,0))
-    d.text((40, 180), f"Verdict: {verdict}  (conf={confidence:.2f})", fill=(0,0,0))
-    d.text((40, 260), title[:90], fill=(10,10,10))
-    img.save(out_path, "PNG")
+    d.text((40, 32), APP_BRAND, fill=(0,0,0), font=_FONT_TITLE)
+    d.text((40, 180), f"Verdict: {verdict}  (conf={confidence:.2f})", fill=(0,0,0), font=_FONT_BODY)
+    # ~64 chars of DejaVu 28px fit the card width
+    d.multiline_text((40, 260), "\n".join(textwrap.wrap(title[:180], 64)[:3]), fill=(10,10,10),
+                     font=_FONT_BODY, spacing=10)
+    # transient file: fast zlib level beats a slightly smaller PNG
+    img.save(out_path, "PNG", optimize=False, compress_level=1)
     return out_path
 
+def _draw_lines(c, lines: List[str], font: str, size: float, leading: float, y: float, H: float) -> float:
+    """Write `lines` through text objects from y downwards, breaking pages at 4cm; returns the new y."""
+    to = c.beginText(2*cm, y)
+    to.setFont(font, size)
+    to.setLeading(leading)
+    for line in lines:
+        to.textLine(line)
+        if to.getY() < 4*cm:
+            c.drawText(to)
+            c.showPage()
+            to = c.beginText(2*cm, H - 2*cm)
+            to.setFont(font, size)
+            to.setLeading(leading)
+    c.drawText(to)
+    return to.getY()
+
 def make_pdf_report(payload: Dict[str, Any], out_path: str, heatmap_path: Optional[str] = None):
     c = canvas.Canvas(out_path, pagesize=A4)
     W, H = A4
@@ -30,22 +56,18 @@ def make_pdf_report(payload: Dict[str, Any], out_path: str, heatmap_path: Option
     c.drawString(2*cm, y, f"Verdict: {payload.get('verdict')}")
     y -= 0.8*cm
     # subclaims
-    for sc in payload.get("subclaim_results",[])[:6]:
-        c.drawString(2*cm, y, f"[{sc.get('id')}] {sc.get('text')} → {sc.get('label')} ({sc.get('confidence')})")
-        y -= 0.6*cm
-        if y < 4*cm:
-            c.showPage(); y = H - 2*cm
+    lines = [f"[{sc.get('id')}] {sc.get('text')} → {sc.get('label')} ({sc.get('confidence')})"
+             for sc in payload.get("subclaim_results",[])[:6]]
+    y = _draw_lines(c, lines, "Helvetica", 12, 0.6*cm, y, H)
     # evidence
     y -= 0.4*cm
+    if y < 4*cm:
+        c.showPage(); y = H - 2*cm
     c.setFont("Helvetica-Bold", 13)
     c.drawString(2*cm, y, "Top Evidence:")
     y -= 0.8*cm
-    c.setFont("Helvetica", 11)
-    for ev in payload.get("evidence",[])[:10]:
-        c.drawString(2*cm, y, f"- {ev.get('title','')}")
-        y -= 0.5*cm
-        if y < 4*cm:
-            c.showPage(); y = H - 2*cm
+    lines = [f"- {ev.get('title','')}" for ev in payload.get("evidence",[])[:10]]
+    _draw_lines(c, lines, "Helvetica", 11, 0.5*cm, y, H)
     # heatmap
     if heatmap_path and os.path.exists(heatmap_path):
         c.showPage()
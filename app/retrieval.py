@@ -1,11 +1,25 @@
+import os
 import math
 import time
-from typing import List, Dict, Any, Tuple
-from urllib.parse import urlparse
+import asyncio
+import functools
+import heapq
+from typing import List, Dict, Any, Optional, Tuple
 
-from .brave import BraveClient
-from .utils import dedupe_urls, clean_text
+import ciso8601
+import dateutil.parser as dp
+import numpy as np
 
+from .brave import get_brave_client, normalize_query
+from .utils import dedupe_urls, url_host
+
+
+# Brave searches in flight per retrieve() call (the client's token bucket still sets the rate)
+RETRIEVE_CONCURRENCY = 2
+# A query slower than this (request + retries) falls back to a stale cached result, or is
+# dropped rather than holding up ranking of the others. Leaves room for one retry after a
+# full 15s Brave attempt.
+QUERY_TIMEOUT_SEC = float(os.getenv("RETRIEVE_QUERY_TIMEOUT_SEC", "30"))
 
 # Simple credibility priors (tune as you like)
 DOMAIN_CREDIBILITY = {
@@ -19,67 +33,142 @@ DOMAIN_CREDIBILITY = {
     "wikipedia.org": 0.85, "britannica.com": 0.88, "nature.com": 0.95, "sciencedirect.com": 0.93,
 }
 
+# Pure string functions, memoized: related queries return many of the same URLs/dates
+@functools.lru_cache(maxsize=4096)
 def _host(url: str) -> str:
+    return url_host(url)
+
+def _build_trie(weights: Dict[str, float]) -> Dict[str, Any]:
+    """Reversed-label trie: nasa.gov → {"gov": {"nasa": {"$": 1.0}}}."""
+    root: Dict[str, Any] = {}
+    for dom, w in weights.items():
+        node = root
+        for lbl in reversed(dom.split(".")):
+            node = node.setdefault(lbl, {})
+        node["$"] = w
+    return root
+
+_TRIE = _build_trie(DOMAIN_CREDIBILITY)
+
+@functools.lru_cache(maxsize=4096)
+def _host_credibility(h: str) -> float:
+    # walk labels right-to-left; the deepest weighted node (most specific domain) wins.
+    # O(labels) whatever the size of DOMAIN_CREDIBILITY
+    node, best = _TRIE, 0.70  # default prior
+    for lbl in reversed(h.split(".")) if h else ():
+        node = node.get(lbl)
+        if node is None:
+            break
+        best = node.get("$", best)
+    return best
+
+def _credibility(url: str) -> float:
+    return _host_credibility(_host(url))
+
+# Freshness decays smoothly from 1.0 (today) towards 0.5, halving the excess every half-life
+_HALF_LIFE_DAYS = float(os.getenv("FRESHNESS_HALF_LIFE_DAYS", "365"))
+_FRESH_MISSING, _FRESH_UNPARSED = 0.5, 0.6
+
+@functools.lru_cache(maxsize=8192)
+def _published_ts(published: str) -> float:
+    """POSIX timestamp of a published string; NaN when missing, -inf when it can't be parsed."""
+    if not published or published.isspace():
+        return math.nan
     try:
-        return urlparse(url).netloc.lower()
+        try:
+            # fast path: Brave dates are usually ISO-8601 / RFC-3339
+            dt = ciso8601.parse_datetime(published)
+        except ValueError:
+            dt = dp.parse(published, fuzzy=True)
+        return dt.timestamp()
     except Exception:
-        return ""
+        return -math.inf
 
-def _credibility(url: str) -> float:
-    h = _host(url)
-    for dom, w in DOMAIN_CREDIBILITY.items():
-        if h.endswith(dom):
-            return w
-    return 0.70  # default prior
+def _age_days(published: str, now: float) -> float:
+    """Age in days of a published string; NaN when missing, -1 when it can't be parsed."""
+    ts = _published_ts(published)
+    if math.isnan(ts):
+        return ts
+    if ts == -math.inf:
+        return -1.0
+    return max(0.0, (now - ts) / 86400.0)
 
-def _freshness(published: str) -> float:
+def _freshness_batch(published: List[str], now: Optional[float] = None) -> np.ndarray:
     """
-    Very rough freshness score [0..1].
-    If a date-like string exists and is within ~2 years -> higher.
+    Freshness [0.5..1] for a column of published strings: 0.5 + 0.5 * 0.5**(age_days / half_life).
+    Ages are parsed once and decayed in one array op; missing → 0.5, unparseable → 0.6.
     """
-    if not published:
-        return 0.5
-    try:
-        import dateutil.parser as dp
-        dt = dp.parse(published, fuzzy=True)
-        age_days = max(0.0, (time.time() - dt.timestamp()) / 86400.0)
-        if age_days < 30:
-            return 1.0
-        if age_days < 180:
-            return 0.9
-        if age_days < 365:
-            return 0.8
-        if age_days < 365 * 2:
-            return 0.7
-        return 0.5
-    except Exception:
-        return 0.6
+    if not any(published):
+        # common with Brave: no result in the batch carries a date, nothing to parse
+        return np.full(len(published), _FRESH_MISSING)
+    if now is None:
+        now = time.time()
+    age = np.fromiter((_age_days(p, now) for p in published), np.float64, len(published))
+    fresh = 0.5 + 0.5 * np.power(0.5, age / _HALF_LIFE_DAYS)
+    fresh[age < 0] = _FRESH_UNPARSED
+    fresh[np.isnan(age)] = _FRESH_MISSING
+    return fresh
 
-def _keyword_overlap(query: str, title: str, snippet: str) -> float:
+def _freshness(published: str, now: Optional[float] = None) -> float:
+    """Single-item view of _freshness_batch (kept so the formula lives in one place)."""
+    return float(_freshness_batch([published], now)[0])
+
+_STOPWORDS = frozenset(
+    "a an the of in on at to for and or but is are was were be been being "
+    "this that these those it its".split()
+)
+
+def _query_tokens(query: str) -> frozenset:
+    # str.split() already collapses any whitespace run, so no clean_text pass is needed.
+    # Stopwords add to the denominator without carrying signal; once they are gone from the
+    # query side, the intersection keeps them out of the numerator too
+    return frozenset((query or "").lower().split()) - _STOPWORDS
+
+def _keyword_overlap(q_tokens: frozenset, title: str, snippet: str) -> float:
     """
-    Token overlap between query and (title+snippet).
+    Token overlap between the query tokens and (title+snippet).
     """
-    q = set(clean_text(query).lower().split())
-    hay = set((clean_text(title) + " " + clean_text(snippet)).lower().split())
-    common = q.intersection(hay)
-    if not q:
+    if not q_tokens:
         return 0.3
-    return min(1.0, 0.3 + 0.7 * (len(common) / max(1, len(q))))
+    common = q_tokens.intersection(f"{title or ''} {snippet or ''}".lower().split())
+    return min(1.0, 0.3 + 0.7 * (len(common) / len(q_tokens)))
 
-def score_item(item: Dict[str, Any], query: str) -> Dict[str, Any]:
-    url = item.get("url", "")
-    cred = _credibility(url)
-    fresh = _freshness(item.get("published"))
-    over = _keyword_overlap(query, item.get("title", ""), item.get("snippet", ""))
+def score_batch(items: List[Dict[str, Any]], queries: List[str],
+                now: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Score many results at once; items[i] is a result returned for queries[i].
+    All items are aged against the same `now` (default: time of the call).
+    Columns (credibility, freshness, overlap) are built as float arrays and combined as
+    score = 0.55*cred + 0.25*fresh + 0.20*overlap in one vector op.
+    Enriches the items in place (Python floats, JSON-ready) and returns them;
+    BraveClient.search hands out caller-owned dicts, so nothing shared is touched.
+    """
+    n = len(items)
+    if not n:
+        return []
+    hosts = [_host(it.get("url", "")) for it in items]
+    cred = np.fromiter((_host_credibility(h) for h in hosts), np.float64, n)
+    fresh = _freshness_batch([it.get("published") for it in items], now)
+    q_tokens = {q: _query_tokens(q) for q in set(queries)}  # tokenized once per query
+    over = np.fromiter(
+        (_keyword_overlap(q_tokens[q], it.get("title"), it.get("snippet")) for it, q in zip(items, queries)),
+        np.float64, n,
+    )
     score = 0.55 * cred + 0.25 * fresh + 0.20 * over
-    enriched = dict(item)
-    enriched["score"] = round(float(score), 4)
-    enriched["credibility"] = round(float(cred), 3)
-    enriched["freshness"] = round(float(fresh), 3)
-    enriched["overlap"] = round(float(over), 3)
-    enriched["host"] = _host(url)
-    enriched["query_matched"] = query
-    return enriched
+
+    cols = zip(items, queries, hosts, np.round(score, 4).tolist(), np.round(cred, 3).tolist(),
+               np.round(fresh, 3).tolist(), np.round(over, 3).tolist())
+    for it, q, h, sc, c, f, o in cols:
+        it["score"] = sc
+        it["credibility"] = c
+        it["freshness"] = f
+        it["overlap"] = o
+        it["host"] = h
+        it["query_matched"] = q
+    return items
+
+def score_item(item: Dict[str, Any], query: str) -> Dict[str, Any]:
+    return score_batch([item], [query])[0]
 
 
 class EvidenceRetriever:
@@ -88,36 +177,58 @@ class EvidenceRetriever:
     """
 
     def __init__(self):
-        self.client = BraveClient()
+        self.client = get_brave_client()
 
-    def retrieve(self, queries: List[str], per_query: int = 6, top_k: int = 12) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    async def retrieve(self, queries: List[str], per_query: int = 6, top_k: int = 12) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
         trace = {
             "queries": [],
             "raw": [],
             "ranked": [],
             "explanations": "score = 0.55*credibility + 0.25*freshness + 0.20*keyword_overlap",
+            "timed_out": [],
         }
-        all_scored: List[Dict[str, Any]] = []
-        for q in queries[:5]:
-            res = self.client.search(q, count=per_query)
+        # planners often repeat a query with different casing/spacing: fetch each once
+        seen, qs = set(), []
+        for q in queries:
+            n = normalize_query(q)
+            if n and n not in seen:
+                seen.add(n)
+                qs.append(q)
+        qs = qs[:5]
+
+        sem = asyncio.Semaphore(RETRIEVE_CONCURRENCY)
+
+        async def _search(q: str) -> List[Dict[str, Any]]:
+            async with sem:
+                try:
+                    return await self.client.search(q, count=per_query, deadline=QUERY_TIMEOUT_SEC)
+                except asyncio.TimeoutError:
+                    trace["timed_out"].append(q)
+                    return []
+
+        # fan out the queries concurrently, at most RETRIEVE_CONCURRENCY at a time
+        results = await asyncio.gather(*(_search(q) for q in qs))
+        # flatten to parallel columns and score everything in one batch
+        raw_items: List[Dict[str, Any]] = []
+        raw_queries: List[str] = []
+        for q, res in zip(qs, results):
             trace["queries"].append(q)
-            for r in res:
-                scored = score_item(r, q)
-                all_scored.append(scored)
-                trace["raw"].append(scored)
+            raw_items.extend(res)
+            raw_queries.extend([q] * len(res))
+        all_scored = score_batch(raw_items, raw_queries, now=time.time())
+        trace["raw"] = all_scored
 
         # Deduplicate by URL, keep max score
         by_url: Dict[str, Dict[str, Any]] = {}
         for it in all_scored:
             u = it.get("url")
-            if not u:
-                continue
-            prev = by_url.get(u)
-            if not prev or it["score"] > prev["score"]:
+            if u and (u not in by_url or it["score"] > by_url[u]["score"]):
                 by_url[u] = it
 
-        ranked = sorted(by_url.values(), key=lambda x: x["score"], reverse=True)
-        ranked = ranked[:top_k]
+        # partial sort: O(n log k) for the top_k we keep. Plain tuples compare without a key
+        # function; -i breaks score ties by first appearance and keeps dicts out of comparisons
+        best = heapq.nlargest(top_k, ((it["score"], -i, it) for i, it in enumerate(by_url.values())))
+        ranked = [it for _, _, it in best]
         trace["ranked"] = [
             {k: v for k, v in it.items() if k in ("title", "url", "host", "score", "credibility", "freshness", "overlap", "query_matched", "published", "snippet")}
             for it in ranked
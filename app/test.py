@@ -1 +1,82 @@
+import asyncio
 
+import httpx
+from openai import RateLimitError
+
+from app import pipeline
+
+CLAIM = "The Eiffel Tower was completed in 1889 in Paris."
+EVIDENCE = [
+    {"title": f"Source {i}", "url": f"https://example{i}.org/eiffel", "host": f"example{i}.org",
+     "snippet": "The Eiffel Tower was completed in 1889.", "credibility": 0.9, "freshness": 0.5}
+    for i in range(3)
+]
+
+
+def _rate_limited() -> RateLimitError:
+    req = httpx.Request("POST", "https://api.openai.com/v1/responses")
+    return RateLimitError("rate limited", response=httpx.Response(429, request=req), body=None)
+
+
+def _checker(monkeypatch, batch_entail):
+    """FactChecker on the normal (non-low-RPM) path with every model/search call stubbed."""
+    async def plan(text):
+        return {"subclaims": [{"id": "C1", "text": text}], "queries": [text]}
+
+    async def notes(claims_text, ev_text):
+        return "- notes"
+
+    async def judge(analyst_text, skeptic_text):
+        return {"label": "TRUE", "confidence": 0.8, "rationale": "ok"}
+
+    async def retrieve(queries, per_query=4, top_k=10):
+        return [dict(e) for e in EVIDENCE], {"queries": list(queries), "timed_out": []}
+
+    monkeypatch.setattr(pipeline, "LOW_RPM_MODE", False)
+    monkeypatch.setattr(pipeline, "OPENAI_MAX_RETRIES", 0)
+    monkeypatch.setattr(pipeline, "extract_claims_and_queries", plan)
+    monkeypatch.setattr(pipeline, "batch_entail", batch_entail)
+    monkeypatch.setattr(pipeline, "analyst_notes", notes)
+    monkeypatch.setattr(pipeline, "skeptic_notes", notes)
+    monkeypatch.setattr(pipeline, "judge_from_notes", judge)
+    monkeypatch.setattr(pipeline, "make_share_card", lambda *a, **k: None)
+    monkeypatch.setattr(pipeline, "make_pdf_report", lambda *a, **k: None)
+    fc = pipeline.FactChecker()
+    fc.retriever.retrieve = retrieve
+    return fc
+
+
+def test_failed_entailment_is_not_cached(monkeypatch):
+    calls = []
+
+    async def batch_entail(subclaim, claims_text, ev_text, source_ids):
+        calls.append(subclaim)
+        raise _rate_limited()
+
+    fc = _checker(monkeypatch, batch_entail)
+    text = CLAIM + " (failed entailment)"
+    first = asyncio.run(fc.run(text=text))
+    second = asyncio.run(fc.run(text=text))
+
+    assert first["meta"]["fallbacks_used"] == ["batch_entail"]
+    assert all(v["why"] == "error" for v in first["reasoning_trace"][0]["votes"])
+    assert second["meta"].get("fast_path") != "cached"
+    assert len(calls) == 2
+
+
+def test_complete_run_is_cached(monkeypatch):
+    calls = []
+
+    async def batch_entail(subclaim, claims_text, ev_text, source_ids):
+        calls.append(subclaim)
+        return [{"label": "SUPPORTS", "confidence": 0.9, "why": "match"} for _ in source_ids]
+
+    fc = _checker(monkeypatch, batch_entail)
+    text = CLAIM + " (complete run)"
+    first = asyncio.run(fc.run(text=text))
+    second = asyncio.run(fc.run(text=text))
+
+    assert "fallbacks_used" not in first["meta"]
+    assert first["verdict"] == "TRUE"
+    assert second["meta"]["fast_path"] == "cached"
+    assert len(calls) == 1
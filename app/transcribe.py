@@ -1,23 +1,45 @@
+import io
 import os
 from typing import Optional
 from openai import OpenAI
 from .config import OPENAI_API_KEY
+from .utils import TTLCache, sha1
+
+# Transcripts by audio content hash: re-runs of the same clip skip the API round-trip
+_TX_CACHE = TTLCache(ttl_sec=3600, max_items=128)
+
+_CLIENT: Optional[OpenAI] = None
+
+def _client() -> OpenAI:
+    """One client per process so keep-alive connections (and TLS sessions) are reused."""
+    global _CLIENT
+    if _CLIENT is None:
+        if not OPENAI_API_KEY:
+            raise RuntimeError("Missing OPENAI_API_KEY")
+        _CLIENT = OpenAI(api_key=OPENAI_API_KEY)
+    return _CLIENT
 
 def transcribe_audio(file_path: str) -> Optional[str]:
-    key = OPENAI_API_KEY
-    if not key:
-        raise RuntimeError("Missing OPENAI_API_KEY")
-    client = OpenAI(api_key=key)
+    client = _client()
+    # Read once; the same buffer is rewound for the fallback model instead of reopening the file
+    with open(file_path, "rb") as f:
+        data = f.read()
+    cache_key = sha1(data)
+    cached = _TX_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+    buf = io.BytesIO(data)
+    buf.name = os.path.basename(file_path)  # the SDK infers the audio format from the name
     # Prefer newer small transcription models if available; fallback to whisper-1
     model = "gpt-4o-mini-transcribe"
     try:
-        with open(file_path, "rb") as f:
-            resp = client.audio.transcriptions.create(model=model, file=f)
-        return (resp.text or "").strip()
+        resp = client.audio.transcriptions.create(model=model, file=buf)
     except Exception:
+        buf.seek(0)
         try:
-            with open(file_path, "rb") as f:
-                resp = client.audio.transcriptions.create(model="whisper-1", file=f)
-            return (resp.text or "").strip()
+            resp = client.audio.transcriptions.create(model="whisper-1", file=buf)
         except Exception:
             return None
+    text = (resp.text or "").strip()
+    _TX_CACHE.set(cache_key, text)
+    return text
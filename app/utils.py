@@ -1,16 +1,37 @@
 import re, io, hashlib, time
-from urllib.parse import urlparse
-from typing import List, Optional
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from typing import List, Optional, Union
+
+_WS_RE = re.compile(r'\s+')
 
 def clean_text(s: str) -> str:
-    return re.sub(r'\s+', ' ', (s or '').strip())
+    if not s or s.isspace():
+        return ''
+    return _WS_RE.sub(' ', s.strip())
+
+_HOST_RE = re.compile(r'^[a-zA-Z][a-zA-Z0-9+.-]*://([^/?#]+)')
+
+def url_host(url: str) -> str:
+    """Lowercased host of an absolute URL (no userinfo, no port); '' if there is none.
+    A regex match instead of a full urlparse: only the authority part is needed."""
+    m = _HOST_RE.match(url or '')
+    if not m:
+        return ''
+    h = m.group(1).lower()
+    at = h.rfind('@')
+    if at >= 0:
+        h = h[at + 1:]
+    colon = h.rfind(':')
+    if colon >= 0 and not h.endswith(']'):  # keep bare IPv6 literals intact
+        h = h[:colon]
+    return h
 
 def domain_ok(url: str, whitelist: Optional[List[str]]) -> bool:
     if not whitelist:
         return True
-    try:
-        host = urlparse(url).netloc.lower()
-    except Exception:
+    host = url_host(url)
+    if not host:
         return False
     return any(host.endswith(w.strip().lower()) for w in whitelist if w.strip())
 
@@ -25,37 +46,102 @@ def dedupe_urls(items):
         out.append(it)
     return out
 
+_URL_RE = re.compile(r'https?://\S+')
+
+def canonical_url(url: str) -> str:
+    """Lowercased scheme/host, no fragment, no utm_* tracking params, no trailing slash."""
+    try:
+        p = urlsplit((url or '').strip())
+    except ValueError:
+        return url or ''
+    query = urlencode([(k, v) for k, v in parse_qsl(p.query, keep_blank_values=True)
+                       if not k.lower().startswith('utm_')])
+    return urlunsplit((p.scheme.lower(), p.netloc.lower(), p.path.rstrip('/'), query, ''))
+
+def _snippet_key(snippet: str) -> bytes:
+    norm = clean_text(_URL_RE.sub(' ', snippet or '')).lower()
+    return hashlib.blake2b(norm.encode('utf-8'), digest_size=12).digest()
+
+def dedupe_evidence(items):
+    """
+    Drop repeated sources: same canonical URL (tracking params / fragment aside) or the
+    same normalized snippet (syndicated copies). Keeps the first, i.e. best-ranked, hit.
+    """
+    seen_urls, seen_snippets = set(), set()
+    out = []
+    for it in items:
+        url = canonical_url(it.get("url") or "")
+        snip = it.get("snippet") or ""
+        key = _snippet_key(snip) if snip.strip() else None
+        if (url and url in seen_urls) or (key is not None and key in seen_snippets):
+            continue
+        if url:
+            seen_urls.add(url)
+        if key is not None:
+            seen_snippets.add(key)
+        out.append(it)
+    return out
+
 class TTLCache:
+    """
+    LRU-ordered TTL cache: expiry is checked lazily on the key being read and
+    the oldest entries are evicted on insert, so every operation is O(1).
+    """
     def __init__(self, ttl_sec=900, max_items=256):
         self.ttl = ttl_sec
         self.max = max_items
-        self.store = {}
-
-    def _prune(self):
-        now = time.time()
-        keys = list(self.store.keys())
-        for k in keys:
-            v, exp = self.store[k]
-            if now > exp:
-                self.store.pop(k, None)
-        # size prune
-        if len(self.store) > self.max:
-            for k in list(self.store.keys())[:len(self.store)-self.max]:
-                self.store.pop(k, None)
+        self.store = OrderedDict()
 
     def get(self, key):
-        self._prune()
         item = self.store.get(key)
-        if not item: return None
+        if item is None: return None
         v, exp = item
         if time.time() > exp:
             self.store.pop(key, None)
             return None
+        self.store.move_to_end(key)
         return v
 
     def set(self, key, value):
-        self._prune()
         self.store[key] = (value, time.time() + self.ttl)
+        self.store.move_to_end(key)
+        while len(self.store) > self.max:
+            self.store.popitem(last=False)
+
+class StatsCache:
+    """get/set facade over any mapping-style cache that counts hits and misses."""
+    def __init__(self, store):
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.store.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def peek(self, key):
+        """Lookup without touching the hit/miss counters."""
+        return self.store.get(key)
+
+    def set(self, key, value):
+        self.store[key] = value
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self.store),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+        }
 
-def sha1(data: str) -> str:
-    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+def sha1(data: Union[str, bytes]) -> str:
+    """Cache/identity key, not crypto: BLAKE2b-160 (same 40-hex width, faster in software). Name kept for callers.
+    Bytes (file contents, payloads) are hashed as-is; only str is UTF-8 encoded first."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
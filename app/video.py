@@ -1,15 +1,19 @@
-import cv2, os
+import cv2, os, glob, shutil, subprocess
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 
-def extract_keyframes(video_path: str, out_dir: str, max_frames: int = 5) -> List[str]:
-    os.makedirs(out_dir, exist_ok=True)
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        return []
-    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or 0
+# "ffmpeg" (default): decode codec I-frames only when ffmpeg is on PATH, seeking with OpenCV
+# when that yields fewer than max_frames; "opencv": always seek/decode
+KEYFRAME_BACKEND = os.getenv("KEYFRAME_BACKEND", "ffmpeg").lower()
+_FFMPEG = shutil.which("ffmpeg")
+
+# keyframes are thumbnails: q85 is roughly half the size of the q95 default and encodes faster
+_JPEG_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, 85]
+_WRITE_WORKERS = 4
+
+def _stream_keyframes(cap, out_dir: str, max_frames: int, steps: int = 50) -> List[str]:
+    """Sequential decode, keeping every `steps`-th frame (for streams without a frame count)."""
     frames = []
-    # sample evenly
-    steps = max(1, total // max_frames) if total else 50
     idx = 0
     count = 0
     while True:
@@ -18,11 +22,66 @@ def extract_keyframes(video_path: str, out_dir: str, max_frames: int = 5) -> Lis
             break
         if idx % steps == 0:
             fname = os.path.join(out_dir, f"key_{count:02d}.jpg")
-            cv2.imwrite(fname, frame)
+            cv2.imwrite(fname, frame, _JPEG_PARAMS)
             frames.append(fname)
             count += 1
             if count >= max_frames:
                 break
         idx += 1
-    cap.release()
     return frames
+
+def extract_keyframes_ffmpeg(video_path: str, out_dir: str, max_frames: int = 5,
+                             min_gap_sec: float = 0.0) -> List[str]:
+    """
+    I-frames only (`-skip_frame nokey`: P/B frames are never decoded), at least `min_gap_sec`
+    apart so the picks spread over the video instead of bunching at the start.
+    Raises if ffmpeg is missing or fails.
+    """
+    if not _FFMPEG:
+        raise FileNotFoundError("ffmpeg not found")
+    os.makedirs(out_dir, exist_ok=True)
+    cmd = [_FFMPEG, "-nostdin", "-loglevel", "error", "-skip_frame", "nokey", "-i", video_path]
+    if min_gap_sec > 0:
+        cmd += ["-vf", f"select='isnan(prev_selected_t)+gte(t-prev_selected_t\\,{min_gap_sec:.3f})'"]
+    cmd += ["-vsync", "vfr", "-frames:v", str(max_frames), "-q:v", "4", "-start_number", "0", "-y",
+            os.path.join(out_dir, "key_%02d.jpg")]
+    subprocess.run(cmd, check=True, capture_output=True, timeout=120)
+    return sorted(glob.glob(os.path.join(out_dir, "key_*.jpg")))[:max_frames]
+
+def extract_keyframes(video_path: str, out_dir: str, max_frames: int = 5) -> List[str]:
+    os.makedirs(out_dir, exist_ok=True)
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        return []
+    try:
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or 0
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        if KEYFRAME_BACKEND == "ffmpeg" and _FFMPEG:
+            gap = (total / fps / max_frames) if (total > 0 and fps > 0) else 0.0
+            try:
+                frames = extract_keyframes_ffmpeg(video_path, out_dir, max_frames, min_gap_sec=gap)
+                # short clips often carry only 1-2 I-frames (x264 keyint 250 ≈ 8s at 30fps);
+                # then the evenly spaced seek below gives more coverage
+                if frames and (len(frames) >= max_frames or total <= 0):
+                    return frames
+                for f in frames:
+                    os.remove(f)
+            except (OSError, subprocess.SubprocessError):
+                pass  # fall back to OpenCV below
+        if total <= 0:
+            return _stream_keyframes(cap, out_dir, max_frames)
+        # sample evenly: seek straight to each target instead of decoding every frame;
+        # JPEG encodes (imwrite releases the GIL) overlap with the next seek/decode
+        writes = []
+        targets = sorted({int(i * total / max_frames) for i in range(max_frames)})
+        with ThreadPoolExecutor(max_workers=_WRITE_WORKERS) as ex:
+            for t in targets:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, t)
+                ret, frame = cap.read()
+                if not ret:
+                    continue
+                fname = os.path.join(out_dir, f"key_{len(writes):02d}.jpg")
+                writes.append((fname, ex.submit(cv2.imwrite, fname, frame, _JPEG_PARAMS)))
+        return [fname for fname, fut in writes if fut.result()]
+    finally:
+        cap.release()